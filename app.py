@@ -1,79 +1,60 @@
+import time
+RUN_STARTED_AT = time.perf_counter()
+
 import streamlit as st
-import qrcode
-from io import BytesIO
-import base64
-import pandas as pd
 from database import create_db_tables, get_db, add_survey_entry, update_survey_entry_with_contact, \
-                     get_current_total_sum, update_total_sum, reset_total_sum, \
-                     get_all_contact_entries, get_all_volume_entries
-from streamlit_autorefresh import st_autorefresh
+                     get_cached_total_sum, reset_total_sum, get_reset_epochs, reconcile_total_sum, \
+                     get_contact_entries_page, get_volume_entries_page, entries_frame, \
+                     export_entries_csv, export_entries_parquet, \
+                     DEFAULT_CAMPAIGN, is_valid_campaign, get_campaigns, ensure_campaign, \
+                     get_submission_analytics, get_submissions_per_minute, get_total_sum_version, \
+                     get_entry_id_for_token, is_lock_error
+from sqlalchemy.exc import OperationalError
+from submission_queue import SubmissionQueue
+from journal import SubmissionJournal, DEFAULT_JOURNAL_DIR, DEFAULT_FALLBACK_SECONDS
+from rate_limiting import RateLimiter
+from archive import archive_entries, get_archive_files, read_archived_entries
+from reporting import ReportingSnapshot
+from formatting import format_german_currency, format_german_currency_column
+import assets
+import metrics
+import uuid
+import io
+import concurrent.futures
 import locale # Behalten wir für den Fall, dass andere locale-Funktionen genutzt werden, aber für Formatierung nutzen wir unsere eigene.
 
 # --- NEUER BLOCK: Alle Zahlen in europäisches Zahlenformat formatieren ---
 # Dieser Block ist weiterhin wichtig für andere potenzielle locale-abhängige Funktionen.
 # Aber für die Haupt-Zahlenformatierung nutzen wir jetzt unsere eigene Funktion.
-try:
-    locale.setlocale(locale.LC_ALL, 'de_DE.UTF-8')
-except locale.Error:
+def set_german_locale():
     try:
-        locale.setlocale(locale.LC_ALL, 'de_DE')
+        locale.setlocale(locale.LC_ALL, 'de_DE.UTF-8')
     except locale.Error:
         try:
-            locale.setlocale(locale.LC_ALL, 'German_Germany.1252')
+            locale.setlocale(locale.LC_ALL, 'de_DE')
         except locale.Error:
-            pass # Konnte keine deutsche Locale einstellen.
-
-# --- NEU: Benutzerdefinierte Funktion für deutsche Zahlenformatierung ---
-def format_german_currency(value):
-    """
-    Formatiert einen Float-Wert als deutschen Währungsstring (z.B. 1.234.567,89).
-    Stellt sicher, dass das Komma als Dezimaltrennzeichen und der Punkt als Tausender-Trennzeichen verwendet wird.
-    """
-    if value is None:
-        return "N/A"
-    
-    # Zuerst als String mit zwei Nachkommastellen formatieren (Standardpunkt als Dezimaltrennzeichen)
-    temp_str = f"{float(value):.2f}"
-    
-    # Teile in Ganzzahl- und Dezimalteil auf
-    parts = temp_str.split('.')
-    integer_part = parts[0]
-    decimal_part = parts[1]
-
-    # Tausender-Trennzeichen zum Ganzzahlteil hinzufügen
-    # Nutzt String-Formatierung mit Unterstrich als Trennzeichen, dann Ersetzung durch Punkt
-    formatted_integer_part = f"{int(integer_part):_}".replace("_", ".")
-
-    # Führt Ganzzahlteil und Dezimalteil mit Komma zusammen
-    return f"{formatted_integer_part},{decimal_part}"
-# --- ENDE NEUE FUNKTION ---
-
-
-# --- Funktion zum Laden von Bildern als Base64 ---
-def get_image_base64(image_path):
-    # Sicherstellen, dass die Datei existiert, bevor versucht wird, sie zu öffnen
-    try:
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
-    except FileNotFoundError:
-        st.error(f"Fehler: Bilddatei nicht gefunden unter {image_path}. Bitte Pfad prüfen.")
-        return "" # Leeren String zurückgeben, um Fehler zu vermeiden
+            try:
+                locale.setlocale(locale.LC_ALL, 'German_Germany.1252')
+            except locale.Error:
+                pass # Konnte keine deutsche Locale einstellen.
 
-# Logo als Base64-String laden
-LOGO_BASE64 = get_image_base64("images/vfb_vam_logo.png")
 
-# Lade das Hintergrundbild für die 10%-Anzeige als Base64-String
-BACKGROUND_10_PERCENT_IMG_BASE64 = get_image_base64("images/vfb_cash-trans.png")
+# --- Funktion für die URLs der statisch ausgelieferten Bilder ---
+# Die Bilder liegen im Ordner 'static' und werden von Streamlit direkt ausgeliefert
+# (siehe .streamlit/config.toml). Im Markup steht nur noch die URL statt der Bilddaten.
+LOGO_FILENAME = "vfb_vam_logo.png"
+BACKGROUND_10_PERCENT_FILENAME = "vfb_cash-trans.png" # Hintergrundbild für die 10%-Anzeige
 
-# --- Streamlit App Konfiguration ---
-st.set_page_config(
-    layout="wide",
-    page_title="Versicherungsvolumen Umfrage",
-    initial_sidebar_state="collapsed" # Sidebar nicht initial ausklappen (wird durch Logik gesteuert)
-)
+def get_static_image_url(filename):
+    # Sicherstellen, dass die Datei existiert, bevor die URL verwendet wird
+    try:
+        return assets.static_url(filename)
+    except FileNotFoundError:
+        return None
 
 # --- CSS zur Anpassung der Streamlit UI ---
-hide_streamlit_ui_and_logo_css = f"""
+def build_page_head_html(logo_url, background_10_percent_img_url):
+    hide_streamlit_ui_and_logo_css = f"""
 <style>
 #MainMenu {{ visibility: hidden !important; }}
 footer {{ display: none !important; }}
@@ -163,6 +144,25 @@ margin-left: 0px;
     width: 60%;
 }}
 
+/* Hintergrundbild der 10%-Anzeige: steht hier im CSS, damit die Live-Aktualisierung
+   der Summe nur die Zahl und nicht jedes Mal die Bild-URL mitschickt */
+.ten_percent_box {{
+    background-image: url('{background_10_percent_img_url}');
+    background-size: 250px;
+    background-position: center;
+    background-repeat: no-repeat;
+    height: 450px;
+    width: 100%; /* Breite des Expanders füllen */
+    display: flex;
+    flex-direction: column;
+    justify-content: top center;
+    align-items: center;
+    margin-top: 20px;
+    color: #202f58;
+    text-align: center; /* Hier muss es 'center' sein für die Gesamtbox */
+    padding: 10px;
+}}
+
 /* Diese Regel scheint nicht mehr nötig zu sein, da der Text jetzt in <div>s ist und richtig angezeigt wird. */
 /* .st-emotion-cache-1wivap2 p {{
     font-size: 0px;
@@ -213,18 +213,142 @@ button.st-emotion-cache-13lcgu3 {{
 }}
 </style>
 """
+    # --- NEU: HTML-Tag für das Logo erstellen ---
+    logo_html_tag = f'<img id="app_logo" src="{logo_url}">'
+    return hide_streamlit_ui_and_logo_css + logo_html_tag
 
-# --- NEU: HTML-Tag für das Logo erstellen ---
-logo_html_tag = f'<img id="app_logo" src="data:image/png;base64,{LOGO_BASE64}">'
-st.markdown(hide_streamlit_ui_and_logo_css + logo_html_tag, unsafe_allow_html=True)
 
+# --- Einmalige Initialisierung pro Prozess ---
+# Streamlit führt dieses Skript bei jeder Interaktion erneut aus. Locale, Datenbankschema
+# (create_all und Migrationen) sowie Bild-URLs und CSS werden daher nur beim ersten Durchlauf
+# eines Prozesses vorbereitet; jeder weitere Rerun rendert nur noch.
+@st.cache_resource(show_spinner=False)
+def bootstrap():
+    """
+    Bereitet den Prozess einmalig vor. Gibt das HTML für CSS und Logo sowie die Namen
+    fehlender Bilddateien zurück.
+    """
+    set_german_locale()
+    create_db_tables() # Stellt sicher, dass die Datenbanktabellen existieren
+    image_urls = {filename: get_static_image_url(filename)
+                  for filename in (LOGO_FILENAME, BACKGROUND_10_PERCENT_FILENAME)}
+    missing_images = [filename for filename, url in image_urls.items() if url is None]
+    page_head_html = build_page_head_html(image_urls[LOGO_FILENAME] or "",
+                                          image_urls[BACKGROUND_10_PERCENT_FILENAME] or "")
+    return page_head_html, missing_images
 
-# --- Initialisierung der Datenbank ---
-create_db_tables() # Stellt sicher, dass die Datenbanktabellen existieren
+# --- Streamlit App Konfiguration ---
+st.set_page_config(
+    layout="wide",
+    page_title="Versicherungsvolumen Umfrage",
+    initial_sidebar_state="collapsed" # Sidebar nicht initial ausklappen (wird durch Logik gesteuert)
+)
+
+PAGE_HEAD_HTML, MISSING_IMAGES = bootstrap()
+for filename in MISSING_IMAGES:
+    st.error(f"Fehler: Bilddatei nicht gefunden unter static/{filename}. Bitte Pfad prüfen.")
+st.markdown(PAGE_HEAD_HTML, unsafe_allow_html=True)
 
 # --- Passwort für den Admin-Bereich ---
 ADMIN_PASSWORD = st.secrets["ADMIN_PASSWORD"]
 
+# --- Optional: Group Commit für Einsendungs-Spitzen (in secrets.toml: GROUP_COMMIT = true) ---
+GROUP_COMMIT_ENABLED = bool(st.secrets.get("GROUP_COMMIT", False))
+
+@st.cache_resource
+def get_submission_queue():
+    # Eine einzige Warteschlange samt Schreib-Thread pro Prozess, geteilt von allen Sessions
+    return SubmissionQueue()
+
+# --- Journal für Einsendungen (in secrets.toml: SUBMISSION_JOURNAL = "fallback" | "always" | "off") ---
+# "fallback": Ist die Datenbank gesperrt, wird die Einsendung dauerhaft ins Journal geschrieben und
+#             später übertragen, statt dem Gast einen Fehler zu zeigen.
+# "always":   Jede Einsendung geht zuerst ins Journal; der Gast erhält sofort eine Bestätigung.
+SUBMISSION_JOURNAL_MODE = str(st.secrets.get("SUBMISSION_JOURNAL", "fallback")).lower()
+SUBMISSION_JOURNAL_DIR = st.secrets.get("SUBMISSION_JOURNAL_DIR", DEFAULT_JOURNAL_DIR)
+# Der Gast wartet höchstens so lange auf eine gesperrte Datenbank, danach übernimmt das Journal.
+# Schreibt die Warteschlange später doch noch, verhindert das Einmal-Token einen doppelten Eintrag.
+SUBMISSION_JOURNAL_FALLBACK_SECONDS = float(st.secrets.get("SUBMISSION_JOURNAL_FALLBACK_SECONDS", DEFAULT_FALLBACK_SECONDS))
+
+@st.cache_resource
+def get_submission_journal():
+    # Ein Journal samt Übertragungs-Thread pro Prozess; beim Start überträgt er auch
+    # Einsendungen, die vor einem Absturz nur im Journal gelandet sind
+    return SubmissionJournal(SUBMISSION_JOURNAL_DIR)
+
+if SUBMISSION_JOURNAL_MODE != "off":
+    get_submission_journal()
+
+def save_submission(volume, campaign, submission_token):
+    """
+    Speichert eine Einsendung je nach Einstellung direkt, über die Warteschlange oder im Journal.
+    Gibt die Eintrags-ID zurück oder None, wenn die Einsendung (noch) nur im Journal liegt.
+    """
+    if SUBMISSION_JOURNAL_MODE == "always":
+        get_submission_journal().append(volume, campaign, submission_token)
+        return None
+    if SUBMISSION_JOURNAL_MODE == "fallback" and not GROUP_COMMIT_ENABLED:
+        # Kurzer Sperr-Timeout statt SQLITE_BUSY_TIMEOUT_SECONDS, danach ins Journal
+        return get_submission_journal().save(volume, campaign, submission_token, SUBMISSION_JOURNAL_FALLBACK_SECONDS)
+    try:
+        if GROUP_COMMIT_ENABLED:
+            timeout = SUBMISSION_JOURNAL_FALLBACK_SECONDS if SUBMISSION_JOURNAL_MODE == "fallback" else None
+            return get_submission_queue().submit(volume, campaign, submission_token, timeout=timeout)
+        db_session = next(get_db())
+        try:
+            return add_survey_entry(db_session, volume, campaign, submission_token)
+        finally:
+            db_session.close()
+    except (OperationalError, concurrent.futures.TimeoutError) as e:
+        if SUBMISSION_JOURNAL_MODE != "fallback" or (isinstance(e, OperationalError) and not is_lock_error(e)):
+            raise
+        get_submission_journal().append(volume, campaign, submission_token)
+        metrics.increment("journal_fallbacks_total")
+        return None
+
+def resolve_entry_id(db_session, submission_token):
+    """
+    Sucht die Eintrags-ID zu einer Einsendung, die über das Journal gespeichert wurde.
+    Ist sie noch nicht übertragen, wird das Journal sofort übertragen.
+    """
+    entry_id = get_entry_id_for_token(db_session, submission_token)
+    if entry_id is None and SUBMISSION_JOURNAL_MODE != "off":
+        get_submission_journal().replay()
+        entry_id = get_entry_id_for_token(db_session, submission_token)
+    return entry_id
+
+# --- Ratenbegrenzung für das Umfrageformular ---
+# Pro Session und pro IP-Adresse ein Token-Bucket; Bursts werden abgewiesen, bevor sie die
+# Datenbank erreichen. Am Veranstaltungsort kommen Hunderte Gäste innerhalb weniger Sekunden
+# über dieselbe WLAN-Adresse: die IP-Grenze fängt daher nur Fluten ab (Burst RATE_LIMIT_IP_BURST,
+# danach RATE_LIMIT_IP_PER_MINUTE; 0 schaltet sie ab). Einzelne Gäste begrenzt die Session-Grenze.
+# (secrets.toml: RATE_LIMIT_PER_MINUTE, RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST)
+RATE_LIMIT_PER_MINUTE = float(st.secrets.get("RATE_LIMIT_PER_MINUTE", 6))
+RATE_LIMIT_IP_PER_MINUTE = float(st.secrets.get("RATE_LIMIT_IP_PER_MINUTE", 1200))
+RATE_LIMIT_IP_BURST = float(st.secrets.get("RATE_LIMIT_IP_BURST", 1000))
+
+@st.cache_resource
+def get_rate_limiters():
+    # Prozessweit geteilt, damit neue Sessions die Grenze nicht umgehen
+    ip_limiter = None
+    if RATE_LIMIT_IP_PER_MINUTE > 0 and RATE_LIMIT_IP_BURST > 0:
+        ip_limiter = RateLimiter(RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE / 60)
+    return RateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_PER_MINUTE / 60), ip_limiter
+
+def submission_allowed():
+    """
+    Prüft die Ratenbegrenzung für die aktuelle Session und IP-Adresse.
+    Gibt (erlaubt, Sekunden bis zum nächsten Versuch) zurück.
+    """
+    session_limiter, ip_limiter = get_rate_limiters()
+    session_key = st.session_state.submission_token
+    if not session_limiter.allow(session_key):
+        return False, session_limiter.retry_after(session_key)
+    ip_address = st.context.ip_address
+    if ip_limiter is not None and ip_address and not ip_limiter.allow(ip_address):
+        return False, ip_limiter.retry_after(ip_address)
+    return True, 0.0
+
 
 # --- Session State Initialisierung ---
 if 'page' not in st.session_state:
@@ -233,12 +357,28 @@ if 'page' not in st.session_state:
 if 'last_survey_entry_id' not in st.session_state:
     st.session_state.last_survey_entry_id = None
 
+# Token einer Einsendung, die noch im Journal liegt (die Eintrags-ID gibt es erst nach dem Übertragen)
+if 'pending_submission_token' not in st.session_state:
+    st.session_state.pending_submission_token = None
+
 if 'logged_in_admin' not in st.session_state:
     st.session_state.logged_in_admin = False
 
+if 'campaign' not in st.session_state:
+    st.session_state.campaign = DEFAULT_CAMPAIGN
+
+# Einmal-Token für das Umfrageformular: Wird dasselbe Formular erneut gesendet (z.B. bei
+# wackeliger Verbindung), liefert die Datenbank den ursprünglichen Eintrag statt eines neuen
+if 'submission_token' not in st.session_state:
+    st.session_state.submission_token = str(uuid.uuid4())
+
 # --- Query Parameters aus der URL lesen ---
 query_params = st.query_params
 
+# Die Kampagne kommt über den QR-Code-Link (z.B. ?view=survey_form&campaign=messe-2025)
+if "campaign" in query_params and is_valid_campaign(query_params["campaign"]):
+    st.session_state.campaign = query_params["campaign"]
+
 # --- Seiten-Routing-Logik basierend auf Query Parameters und Session State ---
 if "view" in query_params:
     st.session_state.logged_in_admin = False
@@ -264,6 +404,11 @@ if "view" in query_params:
                 st.session_state.last_survey_entry_id = int(query_params["entry_id"])
             except ValueError:
                 st.session_state.last_survey_entry_id = None
+        elif "token" in query_params:
+            try:
+                st.session_state.pending_submission_token = str(uuid.UUID(query_params["token"]))
+            except ValueError:
+                st.session_state.pending_submission_token = None
 
 elif "admin" in query_params and not st.session_state.logged_in_admin:
     st.session_state.page = 'admin_login'
@@ -275,21 +420,13 @@ elif not st.session_state.logged_in_admin:
     st.session_state.page = 'presenter_view'
 
 
-# --- Hilfsfunktion zum Generieren von QR-Codes ---
-def generate_qr_code_base64(url):
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=14,
-        border=1,
-    )
-    qr.add_data(url)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+# --- QR-Code-Format (in secrets.toml: QR_CODE_FORMAT = "svg" für Vektorgrafik statt PNG) ---
+QR_CODE_FORMAT = st.secrets.get("QR_CODE_FORMAT", "png")
+# Optionales Diagramm der Einsendungen pro Minute in der Präsentationsansicht (lädt pandas)
+PRESENTER_CHART_ENABLED = bool(st.secrets.get("PRESENTER_CHART", False))
+# Optional: Adresse der statischen Umfrageseite (survey_api.py), z.B. "https://umfrage.example.de/".
+# Ist sie gesetzt, führen QR-Code und Link dorthin statt zum Streamlit-Formular.
+SURVEY_PAGE_URL = st.secrets.get("SURVEY_PAGE_URL", "")
 
 
 # --- Sidebar für die Navigation ---
@@ -299,6 +436,17 @@ if st.session_state.logged_in_admin or \
         st.header("Navigation")
 
         if st.session_state.logged_in_admin:
+            db_session = next(get_db())
+            try:
+                campaigns = get_campaigns(db_session)
+            finally:
+                db_session.close()
+            if st.session_state.campaign not in campaigns:
+                campaigns.append(st.session_state.campaign)
+            # Eigener Widget-Key, damit die Kampagne auch auf Seiten ohne Auswahlfeld erhalten bleibt
+            st.selectbox("Kampagne", campaigns, index=campaigns.index(st.session_state.campaign),
+                         key="campaign_select",
+                         on_change=lambda: st.session_state.update(campaign=st.session_state.campaign_select))
             if st.button("Für Präsentation (Live-Summe)", key="nav_presenter"):
                 st.session_state.page = 'presenter_view'
                 st.rerun()
@@ -314,14 +462,290 @@ if st.session_state.logged_in_admin or \
                 st.stop()
 
         st.caption("Umfrage Link für QR Code:")
-        survey_url_base = f"https://marinesse-konzept.streamlit.app/?view=survey_form"
+        if SURVEY_PAGE_URL:
+            survey_url_base = SURVEY_PAGE_URL
+            if st.session_state.campaign != DEFAULT_CAMPAIGN:
+                survey_url_base += f"?campaign={st.session_state.campaign}"
+        else:
+            survey_url_base = f"https://marinesse-konzept.streamlit.app/?view=survey_form"
+            if st.session_state.campaign != DEFAULT_CAMPAIGN:
+                survey_url_base += f"&campaign={st.session_state.campaign}"
         st.code(survey_url_base)
         st.markdown("**(Bitte URL an deine Hosting-Umgebung anpassen!)**")
 else:
     pass
 
 
+# --- Live-Summe als Fragment ---
+# Statt per st_autorefresh alle 10 Sekunden das ganze Skript neu auszuführen, läuft nur
+# dieses Fragment in kurzen Abständen erneut. Es liest lediglich den Änderungszähler im
+# Speicher; die Datenbank wird erst abgefragt, wenn eine Einsendung committet wurde.
+LIVE_TOTAL_REFRESH_SECONDS = 0.5
+
+@st.fragment(run_every=LIVE_TOTAL_REFRESH_SECONDS)
+@metrics.timed("fragment_render", fragment="live_total")
+def live_total_display():
+    current_total = get_cached_total_sum(st.session_state.campaign)
+    # NEU: Formatierung mit der benutzerdefinierten Funktion
+    formatted_total = format_german_currency(current_total)
+    st.metric(
+        label=" ",
+        value=f"{formatted_total} €",
+        delta_color="off"
+    )
+
+    # NEU: Expander für den 10%-Cashback-Wert
+    with st.expander("10% Anteil anzeigen", expanded=False):
+        percentage_sum = current_total * 0.10
+        formatted_percentage_sum = format_german_currency(percentage_sum)
+
+        # HTML für die 10%-Anzeige; das Hintergrundbild kommt über die CSS-Klasse 'ten_percent_box'
+        ten_percent_html = f"""
+        <div class="ten_percent_box">
+            <div style="font-size: 30px; font-weight: bold; margin-bottom: 5px; color: #202f58;">
+                Davon 10% Spende an den VfB:
+            </div>
+            <div style="font-size: 70px; font-weight: bold; color: #202f58;">
+                {formatted_percentage_sum} €
+            </div>
+        </div>
+        """
+        st.markdown(ten_percent_html, unsafe_allow_html=True)
+
+
+# --- Einsendungen pro Minute (Präsentationsansicht und Admin-Bereich) ---
+# Gelesen wird nur die Rollup-Tabelle. Der Cache-Schlüssel enthält den Änderungszähler der
+# Live-Summe, damit erst nach einer neuen Einsendung wieder abgefragt wird.
+LIVE_CHART_REFRESH_SECONDS = 5
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_submissions_per_minute(campaign, since, version):
+    db_session = next(get_db())
+    try:
+        return [(row.minute, row.entries, row.contacts) for row in get_submissions_per_minute(db_session, campaign, since)]
+    finally:
+        db_session.close()
+
+def submissions_per_minute_frame(rows):
+    import pandas as pd
+    return pd.DataFrame(
+        {"Einsendungen": [entries for _, entries, _ in rows], "davon mit Kontakt": [contacts for _, _, contacts in rows]},
+        index=pd.DatetimeIndex([minute for minute, _, _ in rows], name="Minute"),
+    )
+
+@st.fragment(run_every=LIVE_CHART_REFRESH_SECONDS)
+@metrics.timed("fragment_render", fragment="live_chart")
+def live_submissions_chart():
+    campaign = st.session_state.campaign
+    rows = cached_submissions_per_minute(campaign, None, get_total_sum_version(campaign))
+    if rows:
+        # Nur die letzte Stunde, damit das Diagramm in der Präsentation lesbar bleibt
+        st.bar_chart(submissions_per_minute_frame(rows[-60:])["Einsendungen"], height=200)
+
+
+# --- Hilfsfunktionen für die Admin-Tabellen ---
+# Tabellen und Export arbeiten mit denselben typisierten DataFrames mit Arrow-Spalten (siehe
+# read_entries_frames und entries_frame); die Beträge formatiert format_german_currency_column
+# für die ganze Spalte auf einmal statt Zeile für Zeile.
+# pandas wird erst hier importiert: Umfrageformular und Danke-Seiten (fast der gesamte
+# Verkehr) kommen ohne pandas aus und starten dadurch deutlich schneller.
+def format_timestamp_column(timestamps):
+    # Arrow-Zeitstempel würden bei %S die Sekundenbruchteile mit ausgeben
+    return timestamps.astype("datetime64[us]").dt.strftime("%d.%m.%Y %H:%M:%S")
+
+def contact_entries_frame(entries):
+    import pandas as pd
+    # NEU: Volumen hier formatieren (0 bzw. fehlendes Volumen wird als "N/A" angezeigt)
+    formatted_volume = format_german_currency_column(entries["volume"].where(entries["volume"] != 0))
+    return pd.DataFrame({
+        "ID": entries["id"],
+        "Name": entries["contact_name"],
+        "Firma": entries["contact_company"],
+        "E-Mail": entries["contact_email"],
+        "Telefonnummer": entries["contact_phone"],
+        "Volumen (verknüpft)": formatted_volume + " €", # Angepasster Wert
+        "Zeitpunkt": format_timestamp_column(entries["timestamp"])
+    })
+
+def volume_entries_frame(entries):
+    import pandas as pd
+    return pd.DataFrame({
+        "ID": entries["id"],
+        "Volumen (€)": format_german_currency_column(entries["volume"]), # Angepasster Wert
+        "Name": entries["contact_name"].fillna("").replace("", "-"),
+        "Firma": entries["contact_company"].fillna("").replace("", "-"),
+        "E-Mail": entries["contact_email"].fillna("").replace("", "-"),
+        "Zeitpunkt": format_timestamp_column(entries["timestamp"])
+    })
+
+@st.cache_resource
+def get_reporting_snapshot():
+    # Eine Kopie pro Prozess, geteilt von allen Admin-Sessions
+    return ReportingSnapshot()
+
+def format_snapshot_age(seconds):
+    if seconds < 90:
+        return f"{seconds:.0f} Sekunden"
+    return f"{seconds / 60:.0f} Minuten"
+
+def paginated_entries_table(db_session, table_key, fetch_page, to_frame, contacts_only):
+    """
+    Zeigt eine Admin-Tabelle seitenweise an. Es wird nur die sichtbare Seite aus der
+    Datenbank geladen. Die Cursor der bereits besuchten Seiten liegen im Session State,
+    damit 'Zurück' ohne erneutes Durchlaufen aller Seiten funktioniert.
+    Gibt die Zeilen der aktuellen Seite zurück.
+    """
+    cursors_key = f"{table_key}_page_cursors"
+    if cursors_key not in st.session_state:
+        st.session_state[cursors_key] = [None] # Cursor None = erste Seite
+    cursors = st.session_state[cursors_key]
+
+    rows, next_cursor = fetch_page(db_session, after=cursors[-1])
+    if not rows:
+        return rows
+
+    st.dataframe(to_frame(entries_frame(rows, contacts_only)), use_container_width=True)
+
+    col_newer, col_page, col_older = st.columns([1, 1, 1])
+    with col_newer:
+        if st.button("← Neuere", key=f"{table_key}_newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Seite {len(cursors)}")
+    with col_older:
+        if st.button("Ältere →", key=f"{table_key}_older", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+    return rows
+
+def csv_download(db_session, export_key, to_frame, contacts_only, label, file_name):
+    """
+    Erstellt den CSV-Export erst, wenn er angefordert wird, und bietet ihn dann zum Download an.
+    Der Download löst keinen Rerun aus; beim nächsten Rerun wird der Export wieder verworfen.
+    """
+    if st.button(f"{label} (Export erstellen)", key=f"prepare_{export_key}"):
+        csv_file = export_entries_csv(db_session, to_frame, contacts_only=contacts_only,
+                                      campaign=st.session_state.campaign)
+        try:
+            csv_data = csv_file.read()
+        finally:
+            csv_file.close()
+        st.download_button(
+            label=label,
+            data=csv_data,
+            file_name=file_name,
+            mime="text/csv",
+            key=f"download_{export_key}",
+            on_click="ignore"
+        )
+
+def parquet_download(db_session, export_key, contacts_only, label, file_name):
+    """
+    Wie csv_download, aber als Parquet-Datei mit typisierten Spalten (Volumen als Zahl, Zeitpunkt
+    als Zeitstempel) für die Auswertung nach der Veranstaltung, z.B. mit pandas.
+    """
+    if st.button(f"{label} (Export erstellen)", key=f"prepare_{export_key}_parquet"):
+        parquet_file = export_entries_parquet(db_session, contacts_only=contacts_only,
+                                              campaign=st.session_state.campaign)
+        try:
+            parquet_data = parquet_file.read()
+        finally:
+            parquet_file.close()
+        st.download_button(
+            label=label,
+            data=parquet_data,
+            file_name=file_name,
+            mime="application/vnd.apache.parquet",
+            key=f"download_{export_key}_parquet",
+            on_click="ignore"
+        )
+
+def analytics_panel(campaign, since):
+    """
+    Zeigt Einsendungen pro Minute, Kontaktquote und Verteilung der Volumina einer Kampagne an.
+    Alle Werte stammen aus der Rollup-Tabelle; der Aufwand hängt nur von der Zahl der Minuten
+    und Volumenklassen ab, nicht von der Zahl der Einträge.
+    """
+    import pandas as pd
+    db_session = next(get_db())
+    try:
+        analytics = get_submission_analytics(db_session, campaign, since)
+    finally:
+        db_session.close()
+    if not analytics["entries"]:
+        st.info("Für diesen Zeitraum liegen noch keine Einsendungen vor.")
+        return
+
+    percentiles = analytics["percentiles"]
+    col_entries, col_conversion, col_median, col_p90 = st.columns(4)
+    col_entries.metric("Einsendungen", f"{analytics['entries']:_}".replace("_", "."))
+    col_conversion.metric("Kontaktquote", f"{analytics['conversion_rate'] * 100:.1f} %".replace(".", ","))
+    col_median.metric("Median (ca.)", f"{format_german_currency(percentiles[0.5])} €")
+    col_p90.metric("90. Perzentil (ca.)", f"{format_german_currency(percentiles[0.9])} €")
+    st.caption("Perzentile sind innerhalb der Volumenklassen interpoliert. "
+               f"25. Perzentil ca. {format_german_currency(percentiles[0.25])} €, "
+               f"75. Perzentil ca. {format_german_currency(percentiles[0.75])} €.")
+
+    st.markdown("**Einsendungen pro Minute**")
+    rows = cached_submissions_per_minute(campaign, since, get_total_sum_version(campaign))
+    st.bar_chart(submissions_per_minute_frame(rows), stack=False)
+
+    st.markdown("**Verteilung der Volumina**")
+    histogram = analytics["histogram"]
+    labels = [
+        f"{format_german_currency(bucket['lower'])[:-3]} – {format_german_currency(bucket['upper'])[:-3]} €"
+        if bucket["upper"] is not None else f"ab {format_german_currency(bucket['lower'])[:-3]} €"
+        for bucket in histogram
+    ]
+    # Kategorischer Index in Klassenreihenfolge, sonst sortiert das Diagramm alphabetisch
+    st.bar_chart(pd.DataFrame(
+        {"Einsendungen": [bucket["entries"] for bucket in histogram]},
+        index=pd.CategoricalIndex(labels, categories=labels, ordered=True, name="Volumen"),
+    ))
+
+def metrics_panel():
+    """
+    Zeigt die prozessweiten Messwerte (Datenbank, Seiten, Fragment, QR-Code) im Admin-Bereich an
+    und bietet sie im Prometheus-Textformat zum Download an.
+    """
+    import pandas as pd
+    counters, timings = metrics.snapshot()
+    format_labels = lambda labels: ", ".join(f"{key}={value}" for key, value in labels.items()) or "-"
+    if timings:
+        st.dataframe(pd.DataFrame({
+            "Messwert": [timing["name"] for timing in timings],
+            "Labels": [format_labels(timing["labels"]) for timing in timings],
+            "Anzahl": [timing["count"] for timing in timings],
+            "Ø ms": [round(timing["avg_seconds"] * 1000, 2) for timing in timings],
+            "Max ms": [round(timing["max_seconds"] * 1000, 2) for timing in timings],
+        }), use_container_width=True, hide_index=True)
+    if counters:
+        st.dataframe(pd.DataFrame({
+            "Zähler": [counter["name"] for counter in counters],
+            "Labels": [format_labels(counter["labels"]) for counter in counters],
+            "Wert": [counter["value"] for counter in counters],
+        }), use_container_width=True, hide_index=True)
+    col_export, col_reset = st.columns([1, 1])
+    with col_export:
+        st.download_button("Prometheus-Textformat herunterladen", data=metrics.prometheus_text(),
+                           file_name="umfrage_metrics.txt", mime="text/plain",
+                           key="download_metrics", on_click="ignore")
+    with col_reset:
+        if st.button("Messwerte zurücksetzen", key="reset_metrics"):
+            metrics.reset()
+            st.rerun()
+
+
+# Alles bis hierher läuft bei jedem Rerun, unabhängig von der Seite
+metrics.observe("script_setup", time.perf_counter() - RUN_STARTED_AT)
+
+
 # --- Seiten-Rendering-Logik ---
+# Die Laufzeit jeder Seite wird gemessen (siehe Admin-Bereich → Messwerte). Durchläufe, die
+# mit st.rerun() oder st.stop() enden (z.B. Navigation), werden nicht erfasst.
+PAGE_STARTED_AT = time.perf_counter()
+rendered_page = st.session_state.page
 
 # --- Presenter View (für die Präsentation) ---
 if st.session_state.page == 'presenter_view':
@@ -332,77 +756,19 @@ if st.session_state.page == 'presenter_view':
 
     with col1:
         st.subheader("Umfrage-Teilnahme")
-        qr_img_data = generate_qr_code_base64(survey_url_base)
-        st.image(f"data:image/png;base64,{qr_img_data}", caption="")
+        # Der QR-Code wird pro Prozess nur einmal erzeugt und als fertige Data-URI wiederverwendet
+        with metrics.timed("qr_render", format=QR_CODE_FORMAT):
+            qr_img_data = assets.generate_qr_code_data_uri(survey_url_base, QR_CODE_FORMAT)
+        # SVG ist ein Vektorformat und wird daher auf die Spaltenbreite skaliert
+        st.image(qr_img_data, caption="", use_container_width=(QR_CODE_FORMAT == "svg"))
         st.markdown(f"Alternativ: [Direkt zum Formular]({survey_url_base})")
 
     with col2:
         st.subheader("📊 Live-Summe des geschätzten Versicherungsvolumens")
-        total_sum_placeholder = st.empty()
-        
-        # Funktion zur Aktualisierung der Gesamt-Summen-Anzeige
-        def update_total_sum_display():
-            db_session = next(get_db())
-            try:
-                current_total = get_current_total_sum(db_session)
-                # NEU: Formatierung mit der benutzerdefinierten Funktion
-                formatted_total = format_german_currency(current_total)
-                total_sum_placeholder.metric(
-                    label=" ",
-                    value=f"{formatted_total} €",
-                    delta_color="off"
-                )
-            finally:
-                db_session.close()
-
-        update_total_sum_display() # Erste Anzeige der GESAMTSUMME beim Laden der Seite
-
-        # NEU: Expander für den 10%-Cashback-Wert
-        with st.expander("10% Anteil anzeigen", expanded=False):
-            db_session = next(get_db())
-            try:
-                current_total = get_current_total_sum(db_session) # Hole die aktuelle Summe
-                percentage_sum = current_total * 0.10
-                # NEU: Formatierung mit der benutzerdefinierten Funktion
-                formatted_percentage_sum = format_german_currency(percentage_sum)
-
-                # HTML für die 10%-Anzeige mit Hintergrundbild
-                ten_percent_html = f"""
-                <div style="
-                    background-image: url('data:image/png;base64,{BACKGROUND_10_PERCENT_IMG_BASE64}');
-                    background-size: 250px;
-                    background-position: center;
-                    background-repeat: no-repeat;
-                    height: 450px;
-                    width: 100%; /* Breite des Expanders füllen */
-                    display: flex;
-                    flex-direction: column;
-                    justify-content: top center;
-                    align-items: center;
-                    margin-top: 20px;
-                    color: #202f58;
-                    text-align: center; /* Hier muss es 'center' sein für die Gesamtbox */
-                    padding: 10px;
-                ">
-                    <div style="font-size: 30px; font-weight: bold; margin-bottom: 5px; color: #202f58;">
-                        Davon 10% Spende an den VfB:
-                    </div>
-                    <div style="font-size: 70px; font-weight: bold; color: #202f58;">
-                        {formatted_percentage_sum} €
-                    </div>
-                </div>
-                """
-                st.markdown(ten_percent_html, unsafe_allow_html=True)
-            finally:
-                db_session.close()
-
-        # Manueller Aktualisieren-Button für die Gesamtsumme (kann bleiben)
-        if st.button("Gesamtsumme sofort aktualisieren", key="refresh_sum_manual"):
-            update_total_sum_display() # Aktualisiert die Gesamtsumme sofort
-            st.success("Gesamtsumme aktualisiert!")
-
-        # Auto-Refresh nur für die GESAMTSUMME
-        st_autorefresh(interval=10 * 1000, key="total_sum_auto_refresh")
+        live_total_display()
+        st.caption("Die Summe aktualisiert sich automatisch, sobald neue Beträge eingehen.")
+        if PRESENTER_CHART_ENABLED:
+            live_submissions_chart()
 
 
 # --- Public Survey Form (für den Nutzer nach dem QR-Scan) ---
@@ -422,10 +788,13 @@ elif st.session_state.page == 'survey_form':
         )
         submit_button = st.form_submit_button("Betrag senden")
 
-        if submit_button:
-            db_session = next(get_db())
+        allowed, retry_after = submission_allowed() if submit_button else (True, 0.0)
+        if not allowed:
+            st.warning(f"Zu viele Einsendungen in kurzer Zeit. Bitte versuchen Sie es in {max(1, round(retry_after))} Sekunden erneut.")
+        elif submit_button:
             try:
-                entry_id = add_survey_entry(db_session, volume_input)
+                entry_id = save_submission(volume_input, st.session_state.campaign,
+                                           st.session_state.submission_token)
                 st.session_state.last_survey_entry_id = entry_id
 
                 # --- WICHTIG: Direkter HTML-Redirect ---
@@ -433,7 +802,8 @@ elif st.session_state.page == 'survey_form':
 
                 # Basis-URL (anpassen, wenn gehostet!)
                 base_url = "https://marinesse-konzept.streamlit.app/"
-                redirect_url = f"{base_url}/?view=thank_you_with_contact_option&entry_id={entry_id}"
+                redirect_url = f"{base_url}/?view=thank_you_with_contact_option&entry_id={entry_id}" if entry_id is not None \
+                    else f"{base_url}/?view=thank_you_with_contact_option&token={st.session_state.submission_token}"
 
                 # Dies ist der entscheidende Befehl: Erzwingt einen Browser-Redirect
                 st.markdown(f'<meta http-equiv="refresh" content="0;url={redirect_url}">', unsafe_allow_html=True)
@@ -445,8 +815,6 @@ elif st.session_state.page == 'survey_form':
                 st.error(f"Ein Fehler ist aufgetreten: {e}")
                 st.session_state.last_survey_entry_id = None # Im Fehlerfall ID löschen
                 # Hier ist kein st.rerun() nötig, da der Fehler angezeigt wird und die Ausführung danach eh endet.
-            finally:
-                db_session.close() # Datenbank-Session immer schließen
 
             # Keinen st.rerun() hier unten, da st.stop() die Ausführung schon beendet hat.
 
@@ -466,7 +834,8 @@ elif st.session_state.page == 'thank_you_with_contact_option':
             st.session_state.last_survey_entry_id = None # Wenn ungültig, ID löschen
 
 
-    if st.session_state.last_survey_entry_id: # Nur anzeigen, wenn eine Umfrage-ID vorhanden ist
+    # Nur anzeigen, wenn eine Umfrage-ID (oder das Token einer Einsendung im Journal) vorhanden ist
+    if st.session_state.last_survey_entry_id or st.session_state.pending_submission_token:
         st.subheader("📣 Sie möchten mehr erfahren?")
         st.write("Hinterlassen Sie uns gerne Ihre Kontaktdaten, um weitere unverbindliche Informationen zu dieser Aktion zu erhalten.")
 
@@ -481,9 +850,14 @@ elif st.session_state.page == 'thank_you_with_contact_option':
             if contact_submit_button:
                 db_session = next(get_db())
                 try:
+                    entry_id = st.session_state.last_survey_entry_id or \
+                        resolve_entry_id(db_session, st.session_state.pending_submission_token)
+                    if entry_id is None:
+                        st.warning("Ihr Betrag wird gerade noch gespeichert. Bitte senden Sie die Kontaktdaten in einigen Sekunden erneut.")
+                        st.stop()
                     update_survey_entry_with_contact(
                         db_session,
-                        st.session_state.last_survey_entry_id,
+                        entry_id,
                         contact_name if contact_name else None,
                         contact_company if contact_company else None,
                         contact_email if contact_email else None,
@@ -492,6 +866,7 @@ elif st.session_state.page == 'thank_you_with_contact_option':
                     )
                     st.success("Ihre Kontaktdaten wurden erfasst. Vielen Dank!")
                     st.session_state.last_survey_entry_id = None # ID löschen
+                    st.session_state.pending_submission_token = None
 
                     # --- WICHTIG: Direkter HTML-Redirect zur finalen Danke-Seite ---
                     base_url = "https://marinesse-konzept.streamlit.app" # ANPASSEN, WENN GEHOSTET!
@@ -510,6 +885,7 @@ elif st.session_state.page == 'thank_you_with_contact_option':
         st.warning("Es gab ein Problem beim Abrufen Ihrer Umfrage-ID. Bitte versuchen Sie es erneut.")
         if st.button("Zurück zum Umfrageformular", key="back_to_survey_from_thankyou_error"): # Eindeutiger Key
             st.session_state.page = 'survey_form'
+            st.session_state.submission_token = str(uuid.uuid4()) # Neue Einsendung, neues Token
             st.rerun()
 
 # --- Thank You Page (FINAL) ---
@@ -543,7 +919,24 @@ elif st.session_state.page == 'admin_login':
 # --- Admin View (für dich) ---
 elif st.session_state.page == 'admin_view':
     if st.session_state.logged_in_admin:
+        campaign = st.session_state.campaign
         st.title("⚙️ Admin-Bereich")
+        st.caption(f"Kampagne: {campaign}")
+        st.markdown("---")
+
+        st.subheader("Kampagnen")
+        with st.form(key="new_campaign_form"):
+            new_campaign = st.text_input("Neue Kampagne (Kleinbuchstaben, Ziffern, '-' und '_')", key="new_campaign_name")
+            if st.form_submit_button("Kampagne anlegen"):
+                if not is_valid_campaign(new_campaign):
+                    st.error("Ungültiger Kampagnenname.")
+                else:
+                    db_session = next(get_db())
+                    try:
+                        ensure_campaign(db_session, new_campaign)
+                    finally:
+                        db_session.close()
+                    st.success(f"Kampagne '{new_campaign}' angelegt. Sie kann links in der Navigation ausgewählt werden.")
         st.markdown("---")
 
         st.subheader("Summe zurücksetzen")
@@ -551,43 +944,97 @@ elif st.session_state.page == 'admin_view':
         if st.button("Live-Summe zurücksetzen", key="reset_button"):
             db_session = next(get_db())
             try:
-                reset_total_sum(db_session)
+                reset_total_sum(db_session, campaign)
                 st.success("Die Live-Summe wurde erfolgreich auf 0 zurückgesetzt.")
             except Exception as e:
                 st.error(f"Fehler beim Zurücksetzen der Summe: {e}")
             finally:
                 db_session.close()
+
+        # Jedes Zurücksetzen beginnt eine neue Epoche; der Stand davor bleibt nachvollziehbar
+        db_session = next(get_db())
+        try:
+            epochs = get_reset_epochs(db_session, campaign)
+            current_epoch_started_at = epochs[0].started_at if epochs else None
+            if len(epochs) > 1:
+                import pandas as pd
+                with st.expander("Bisherige Zurücksetzungen"):
+                    st.dataframe(pd.DataFrame({
+                        "Epoche": [epoch.id for epoch in epochs],
+                        "Beginn": [epoch.started_at.strftime("%d.%m.%Y %H:%M:%S") for epoch in epochs],
+                        "Summe vor dem Zurücksetzen (€)": [format_german_currency(epoch.total_before_reset) for epoch in epochs],
+                    }), use_container_width=True)
+
+            if st.button("Live-Summe prüfen", key="reconcile_button"):
+                result = reconcile_total_sum(db_session, campaign=campaign)
+                if result is None or result["consistent"]:
+                    st.success("Die Live-Summe stimmt mit den gespeicherten Einträgen überein.")
+                else:
+                    st.error(f"Abweichung von {format_german_currency(result['difference'])} € zwischen "
+                             f"Checkpoint und Einträgen. Bitte 'python manage.py reconcile --repair --campaign {campaign}' ausführen.")
+        finally:
+            db_session.close()
+        if SUBMISSION_JOURNAL_MODE != "off":
+            pending_submissions = get_submission_journal().pending()
+            if pending_submissions:
+                st.info(f"{pending_submissions} Einsendungen liegen im Journal und werden gerade in die Datenbank übertragen.")
+        st.markdown("---")
+
+        st.subheader("Archiv")
+        st.caption("Einträge vor dem letzten Zurücksetzen (und älter als eine Stunde) werden als Parquet-Datei "
+                   "archiviert und aus den Listen unten entfernt. Live-Summe und Auswertung bleiben unverändert.")
+        if st.button("Abgeschlossene Epochen archivieren", key="archive_button"):
+            db_session = next(get_db())
+            try:
+                archived = archive_entries(db_session, campaign)
+                if archived is None:
+                    st.info("Es gibt keine Einträge abgeschlossener Epochen zu archivieren.")
+                else:
+                    # Die Listen unten sollen die archivierten Einträge sofort nicht mehr zeigen
+                    get_reporting_snapshot().refresh()
+                    st.success(f"{archived['entries']} Einträge archiviert.")
+            except Exception as e:
+                st.error(f"Fehler beim Archivieren: {e}")
+            finally:
+                db_session.close()
+        archive_files = get_archive_files(campaign)
+        if archive_files:
+            archived_entries = f"{sum(file['entries'] for file in archive_files):_}".replace("_", ".")
+            archive_size = f"{sum(file['bytes'] for file in archive_files) / 2**20:.1f}".replace(".", ",")
+            st.write(f"Im Archiv: {archived_entries} Einträge in {len(archive_files)} Dateien ({archive_size} MiB)")
+            if st.button("Archivierte Einträge als Parquet herunterladen (Export erstellen)", key="prepare_archive"):
+                archive_data = io.BytesIO()
+                read_archived_entries(campaign).to_parquet(archive_data, index=False)
+                st.download_button("Archivierte Einträge als Parquet herunterladen", data=archive_data.getvalue(),
+                                   file_name=f"umfrage_archiv_{campaign}.parquet",
+                                   mime="application/vnd.apache.parquet",
+                                   key="download_archive", on_click="ignore")
         st.markdown("---")
 
+        # Listen und Exporte lesen bei SQLite aus einer regelmäßig erneuerten Kopie der Datenbank,
+        # damit lange Lesezugriffe die Einsendungen der Gäste nicht ausbremsen
+        reporting_snapshot = get_reporting_snapshot()
+        if reporting_snapshot.enabled:
+            col_snapshot_age, col_snapshot_refresh = st.columns([3, 1])
+            with col_snapshot_refresh:
+                if st.button("Stand aktualisieren", key="refresh_snapshot"):
+                    reporting_snapshot.refresh()
+
         st.subheader("Gesammelte Kontaktdaten")
-        db_session = next(get_db())
+        db_session = reporting_snapshot.session()
         try:
-            contact_entries = get_all_contact_entries(db_session)
-            if contact_entries:
-                data = []
-                for entry in contact_entries:
-                    # NEU: Volumen hier formatieren
-                    formatted_volume = format_german_currency(entry.volume) if entry.volume else "N/A"
-                    data.append({
-                        "ID": entry.id,
-                        "Name": entry.contact_name,
-                        "Firma": entry.contact_company,
-                        "E-Mail": entry.contact_email,
-                        "Telefonnummer": entry.contact_phone, 
-                        "Volumen (verknüpft)": f"{formatted_volume} €", # Angepasster Wert
-                        "Zeitpunkt": entry.timestamp.strftime("%d.%m.%Y %H:%M:%S")
-                    })
-                df_contacts = pd.DataFrame(data)
-                st.dataframe(df_contacts, use_container_width=True)
-
-                csv_file_contacts = df_contacts.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Kontaktdaten als CSV herunterladen",
-                    data=csv_file_contacts,
-                    file_name="umfrage_kontaktdaten.csv",
-                    mime="text/csv",
-                    key="download_contacts"
-                )
+            contact_rows = paginated_entries_table(
+                db_session, f"contacts_{campaign}",
+                lambda db_session, after: get_contact_entries_page(db_session, after=after, campaign=campaign),
+                contact_entries_frame, contacts_only=True
+            )
+            if contact_rows:
+                csv_download(db_session, "contacts", contact_entries_frame, contacts_only=True,
+                             label="Kontaktdaten als CSV herunterladen",
+                             file_name=f"umfrage_kontaktdaten_{campaign}.csv")
+                parquet_download(db_session, "contacts", contacts_only=True,
+                                 label="Kontaktdaten als Parquet herunterladen",
+                                 file_name=f"umfrage_kontaktdaten_{campaign}.parquet")
             else:
                 st.info("Es wurden noch keine Kontaktdaten übermittelt.")
         finally:
@@ -595,39 +1042,47 @@ elif st.session_state.page == 'admin_view':
         st.markdown("---")
 
         st.subheader("Alle erfassten Volumen-Einträge")
-        db_session = next(get_db())
+        db_session = reporting_snapshot.session()
         try:
-            all_volume_entries = get_all_volume_entries(db_session)
-            if all_volume_entries:
-                data_all = []
-                for entry in all_volume_entries:
-                    # NEU: Volumen hier formatieren
-                    formatted_volume_all = format_german_currency(entry.volume)
-                    data_all.append({
-                        "ID": entry.id,
-                        "Volumen (€)": f"{formatted_volume_all}", # Angepasster Wert
-                        "Name": entry.contact_name if entry.contact_name else "-",
-                        "Firma": entry.contact_company if entry.contact_company else "-",
-                        "E-Mail": entry.contact_email if entry.contact_email else "-",
-                        "Zeitpunkt": entry.timestamp.strftime("%d.%m.%Y %H:%M:%S")
-                    })
-                df_all = pd.DataFrame(data_all)
-                st.dataframe(df_all, use_container_width=True)
-
-                csv_file_all = df_all.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Alle Einträge als CSV herunterladen",
-                    data=csv_file_all,
-                    file_name="umfrage_alle_eintraege.csv",
-                    mime="text/csv",
-                    key="download_all_entries"
-                )
+            volume_rows = paginated_entries_table(
+                db_session, f"volumes_{campaign}",
+                lambda db_session, after: get_volume_entries_page(db_session, after=after, campaign=campaign),
+                volume_entries_frame, contacts_only=False
+            )
+            if volume_rows:
+                csv_download(db_session, "all_entries", volume_entries_frame, contacts_only=False,
+                             label="Alle Einträge als CSV herunterladen",
+                             file_name=f"umfrage_alle_eintraege_{campaign}.csv")
+                parquet_download(db_session, "all_entries", contacts_only=False,
+                                 label="Alle Einträge als Parquet herunterladen",
+                                 file_name=f"umfrage_alle_eintraege_{campaign}.parquet")
             else:
                 st.info("Es wurden noch keine Volumen-Einträge erfasst.")
         finally:
             db_session.close()
+        st.markdown("---")
+
+        if reporting_snapshot.enabled and reporting_snapshot.age_seconds() is not None:
+            # Erst hier anzeigen: die Listen oben haben die Kopie bei Bedarf gerade erneuert
+            col_snapshot_age.caption(
+                f"Stand der Listen und Exporte: vor {format_snapshot_age(reporting_snapshot.age_seconds())} "
+                f"(Kopie der Datenbank, wird spätestens alle {format_snapshot_age(reporting_snapshot.max_age_seconds)} erneuert)"
+            )
+
+        st.subheader("Auswertung")
+        if st.toggle("Auswertung anzeigen (Einsendungen pro Minute, Kontaktquote, Verteilung)", key="show_analytics"):
+            current_epoch_only = st.checkbox("Nur seit dem letzten Zurücksetzen", value=True, key="analytics_current_epoch")
+            analytics_panel(campaign, current_epoch_started_at if current_epoch_only else None)
+        st.markdown("---")
+
+        st.subheader("Messwerte")
+        # Ausgewertet wird nur bei Bedarf; das Erfassen selbst läuft immer mit
+        if st.toggle("Messwerte anzeigen (Datenbank, Seiten, QR-Code)", key="show_metrics"):
+            metrics_panel()
     else:
         st.warning("Sie sind nicht berechtigt, diesen Bereich anzuzeigen. Bitte melden Sie sich an.")
         if st.button("Zum Admin Login", key="unauthorized_admin_login_button"):
             st.session_state.page = 'admin_login'
             st.rerun()
+
+metrics.observe("page_render", time.perf_counter() - PAGE_STARTED_AT, page=rendered_page)
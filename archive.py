@@ -0,0 +1,185 @@
+"""
+Archiv für Einträge abgeschlossener Epochen.
+
+Nach einer Veranstaltung wird die Live-Summe zurückgesetzt; die alten Einträge werden aber
+nicht mehr für die Live-Summe gebraucht und machen Admin-Listen und Exporte nur langsamer.
+archive_entries verschiebt sie in komprimierte Parquet-Dateien, je Kampagne ein Verzeichnis
+im Hive-Format (ARCHIVE_DIR/campaign=<name>/entries_<erste ID>-<letzte ID>.parquet).
+Die Dateien lassen sich weiterhin abfragen, z.B. mit read_archived_entries oder direkt mit
+pandas.read_parquet(ARCHIVE_DIR, filters=[("campaign", "==", "messe-2025")]).
+
+Archiviert werden nur Einträge vor dem Beginn der aktuellen Epoche. Live-Summe, Checkpoint
+und Abgleich (reconcile_total_sum) lesen ausschließlich Einträge der aktuellen Epoche und
+bleiben dadurch unverändert; die Auswertung liest die Rollup-Tabelle, die erhalten bleibt.
+"""
+import os
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+import metrics
+from database import ARCHIVE_DIR, DEFAULT_CAMPAIGN, EXPORT_CHUNK_SIZE, ResetEpoch, SurveyEntry, arrow_schema
+
+# Die Kampagne steckt im Verzeichnisnamen und wird beim Lesen als Spalte ergänzt
+ARCHIVE_COLUMNS = tuple(column for column in SurveyEntry.__table__.columns if column.key != "campaign")
+
+# Einträge, die jünger sind, bleiben in der Datenbank: zu ihnen kann noch das Kontaktformular kommen
+ARCHIVE_MIN_AGE = timedelta(hours=1)
+
+ARCHIVE_FILENAME = re.compile(r"^entries_(\d+)-(\d+)\.parquet$")
+
+
+def _campaign_dir(campaign, archive_dir):
+    return os.path.join(archive_dir, f"campaign={campaign}")
+
+
+def _archive_filter(campaign, epoch_last_entry_id, cutoff):
+    return (SurveyEntry.campaign == campaign, SurveyEntry.id <= epoch_last_entry_id, SurveyEntry.timestamp < cutoff)
+
+
+def _remove_overlapping_archives(target_dir, path, first_entry_id, last_entry_id, archived_ids):
+    # Bricht ein Lauf nach dem Schreiben der Datei, aber vor dem Löschen ab, bleiben die Einträge in
+    # der Datenbank. Der nächste Lauf archiviert sie erneut, eventuell in einem größeren ID-Bereich
+    # und damit in einer anderen Datei. Ältere Dateien dürfen diese Einträge nicht mehr enthalten.
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    for name in os.listdir(target_dir):
+        match = ARCHIVE_FILENAME.match(name)
+        other_path = os.path.join(target_dir, name)
+        if match is None or other_path == path:
+            continue
+        if int(match.group(2)) < first_entry_id or int(match.group(1)) > last_entry_id:
+            continue
+        table = pq.read_table(other_path)
+        remaining = table.filter(pc.invert(pc.is_in(table["id"], value_set=pa.array(archived_ids, pa.int64()))))
+        if remaining.num_rows == 0:
+            os.remove(other_path)
+        elif remaining.num_rows < table.num_rows:
+            # Die übrigen Einträge gibt es nur noch hier: wie die neue Datei erst nach fsync ersetzen
+            temporary_path = os.path.join(target_dir, f".{name}.{os.getpid()}.tmp")
+            with open(temporary_path, "wb") as archive_file:
+                pq.write_table(remaining, archive_file, compression="zstd")
+                archive_file.flush()
+                os.fsync(archive_file.fileno())
+            os.replace(temporary_path, other_path)
+
+
+def archive_entries(db_session, campaign=DEFAULT_CAMPAIGN, before=None, archive_dir=ARCHIVE_DIR,
+                    chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Verschiebt die Einträge einer Kampagne, die vor der aktuellen Epoche liegen, in eine neue
+    Parquet-Datei und löscht sie danach aus 'survey_entries'. Mit 'before' werden nur Einträge
+    archiviert, die zusätzlich älter als dieser Zeitpunkt sind.
+    Gibt ein Dict mit Anzahl, ID-Bereich und Datei zurück oder None, wenn nichts zu archivieren ist.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Alle Einträge bis zu dieser ID gehören zu abgeschlossenen Epochen der Kampagne
+    epoch_last_entry_id = db_session.execute(
+        select(ResetEpoch.last_entry_id).where(ResetEpoch.campaign == campaign).order_by(ResetEpoch.id.desc()).limit(1)
+    ).scalar()
+    if not epoch_last_entry_id:
+        # Noch nie zurückgesetzt: alle Einträge gehören zur laufenden Epoche
+        db_session.rollback()
+        return None
+    cutoff = datetime.now() - ARCHIVE_MIN_AGE
+    if before is not None:
+        cutoff = min(cutoff, before)
+    conditions = _archive_filter(campaign, epoch_last_entry_id, cutoff)
+
+    result = db_session.execute(
+        select(*ARCHIVE_COLUMNS).where(*conditions).order_by(SurveyEntry.id).execution_options(yield_per=chunk_size)
+    )
+    schema = arrow_schema(ARCHIVE_COLUMNS)
+    target_dir = _campaign_dir(campaign, archive_dir)
+    os.makedirs(target_dir, exist_ok=True)
+    # Mit Punkt beginnende Dateien ignoriert pyarrow beim Lesen des Archivs
+    temporary_path = os.path.join(target_dir, f".entries_{os.getpid()}.parquet.tmp")
+    archived_ids = []
+    try:
+        with open(temporary_path, "wb") as archive_file:
+            with pq.ParquetWriter(archive_file, schema, compression="zstd") as writer:
+                for rows in result.partitions():
+                    table = pa.Table.from_pydict(dict(zip(schema.names, zip(*rows))), schema=schema)
+                    writer.write_table(table)
+                    archived_ids.extend(row.id for row in rows)
+            archive_file.flush()
+            os.fsync(archive_file.fileno())
+        # Lesetransaktion beenden, bevor gelöscht wird (SQLite im WAL-Modus, siehe advance_total_checkpoint)
+        db_session.rollback()
+        if not archived_ids:
+            os.remove(temporary_path)
+            return None
+
+        # Der Dateiname ergibt sich aus dem ID-Bereich; ältere Dateien aus einem abgebrochenen
+        # Lauf, die sich mit ihm überschneiden, werden um die Einträge dieser Datei bereinigt
+        archived, first_entry_id, last_entry_id = len(archived_ids), archived_ids[0], archived_ids[-1]
+        path = os.path.join(target_dir, f"entries_{first_entry_id:012d}-{last_entry_id:012d}.parquet")
+        os.replace(temporary_path, path)
+        _remove_overlapping_archives(target_dir, path, first_entry_id, last_entry_id, archived_ids)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+    deleted = db_session.execute(
+        delete(SurveyEntry).where(*conditions, SurveyEntry.id >= first_entry_id, SurveyEntry.id <= last_entry_id)
+    ).rowcount
+    if deleted != archived:
+        # Einträge der abgeschlossenen Epoche ändern sich nicht mehr; sonst lieber nichts löschen
+        db_session.rollback()
+        raise RuntimeError(f"Archivierung abgebrochen: {archived} Einträge archiviert, aber {deleted} zum Löschen gefunden.")
+    db_session.commit()
+    metrics.increment("archived_entries_total", archived, campaign=campaign)
+    return {
+        "campaign": campaign,
+        "entries": archived,
+        "first_entry_id": first_entry_id,
+        "last_entry_id": last_entry_id,
+        "path": path,
+    }
+
+
+def get_archive_files(campaign=DEFAULT_CAMPAIGN, archive_dir=ARCHIVE_DIR):
+    """
+    Listet die Archivdateien einer Kampagne mit Anzahl der Einträge und Dateigröße auf.
+    Gelesen werden nur die Metadaten der Dateien.
+    """
+    import pyarrow.parquet as pq
+    target_dir = _campaign_dir(campaign, archive_dir)
+    if not os.path.isdir(target_dir):
+        return []
+    files = []
+    for name in sorted(os.listdir(target_dir)):
+        if name.startswith(".") or not name.endswith(".parquet"):
+            continue
+        path = os.path.join(target_dir, name)
+        files.append({"name": name, "entries": pq.ParquetFile(path).metadata.num_rows, "bytes": os.path.getsize(path)})
+    return files
+
+
+def read_archived_entries(campaign=None, columns=None, condition=None, archive_dir=ARCHIVE_DIR):
+    """
+    Liest archivierte Einträge als DataFrame mit Arrow-Spalten, optional nur einer Kampagne.
+    'condition' ist ein zusätzlicher pyarrow.dataset-Ausdruck, z.B. pyarrow.dataset.field("volume") > 1000;
+    er wird beim Lesen auf die Row Groups angewendet.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    schema = arrow_schema(ARCHIVE_COLUMNS).append(pa.field("campaign", pa.string()))
+    if not os.path.isdir(archive_dir):
+        return schema.empty_table().select(columns or schema.names).to_pandas(types_mapper=pd.ArrowDtype)
+    # Kampagnennamen wie "2025" sollen Text bleiben und nicht als Zahl erkannt werden
+    partitioning = ds.partitioning(pa.schema([pa.field("campaign", pa.string())]), flavor="hive")
+    dataset = ds.dataset(archive_dir, format="parquet", partitioning=partitioning, schema=schema)
+    expression = condition
+    if campaign is not None:
+        campaign_filter = ds.field("campaign") == campaign
+        expression = campaign_filter if expression is None else expression & campaign_filter
+    return dataset.to_table(columns=columns, filter=expression).to_pandas(types_mapper=pd.ArrowDtype)
@@ -0,0 +1,68 @@
+import base64
+import functools
+import hashlib
+import os
+from io import BytesIO
+
+# qrcode (samt PIL) wird erst in generate_qr_code_data_uri importiert: nur die
+# Präsentationsansicht braucht den QR-Code, das Umfrageformular nicht.
+
+# Unterstützte Ausgabeformate für den QR-Code
+QR_CODE_FORMATS = ("png", "svg")
+
+
+# Verzeichnis, das Streamlit mit 'server.enableStaticServing' unter 'app/static/' ausliefert
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL_PREFIX = "app/static"
+
+
+@functools.lru_cache(maxsize=32)
+def _content_hash(file_path, mtime):
+    # 'mtime' ist nur Teil des Cache-Schlüssels: ändert sich die Datei, wird sie neu gehasht
+    with open(file_path, "rb") as static_file:
+        return hashlib.sha256(static_file.read()).hexdigest()[:12]
+
+
+def static_url(filename):
+    """
+    Gibt die URL einer Datei aus dem 'static'-Verzeichnis mit Inhalts-Hash zurück,
+    z.B. 'app/static/vfb_vam_logo.png?v=1a2b3c4d5e6f'.
+    Durch den Parameter 'v' sendet der Static-File-Handler langlebige Cache-Header,
+    und der Browser lädt das Bild nur neu, wenn sich der Inhalt geändert hat.
+    Wirft FileNotFoundError, wenn die Datei fehlt.
+    """
+    file_path = os.path.join(STATIC_DIR, filename)
+    return f"{STATIC_URL_PREFIX}/{filename}?v={_content_hash(file_path, os.path.getmtime(file_path))}"
+
+
+@functools.lru_cache(maxsize=16)
+def generate_qr_code_data_uri(url, image_format="png"):
+    """
+    Erzeugt einen QR-Code für die URL und gibt ihn als fertige Data-URI zurück,
+    die direkt an st.image übergeben werden kann.
+    Das Ergebnis wird pro (URL, Format) nur einmal pro Prozess berechnet.
+    Mit image_format="svg" entfällt das Rendern über PIL komplett.
+    """
+    if image_format not in QR_CODE_FORMATS:
+        raise ValueError(f"Unbekanntes QR-Code-Format: {image_format}")
+    import qrcode
+    import qrcode.image.svg
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=14,
+        border=1,
+        image_factory=qrcode.image.svg.SvgPathImage if image_format == "svg" else None,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    buffered = BytesIO()
+    if image_format == "svg":
+        qr.make_image().save(buffered)
+        mime_type = "image/svg+xml"
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffered, format="PNG")
+        mime_type = "image/png"
+    return f"data:{mime_type};base64,{base64.b64encode(buffered.getvalue()).decode()}"
@@ -0,0 +1,103 @@
+import functools
+import math
+
+# NumPy und pandas werden erst in format_german_currency_column importiert: die Live-Summe und
+# das Umfrageformular brauchen nur die skalare Funktion und sollen schnell starten.
+
+# Ab diesem Betrag reicht die Genauigkeit von float64 nicht mehr für exakte Cent-Beträge;
+# solche Werte formatiert die Spaltenfunktion einzeln mit der skalaren Funktion.
+_VECTORIZED_MAX_ABS_VALUE = 1e13
+
+
+@functools.lru_cache(maxsize=1)
+def _lookup_tables():
+    # Nachschlagetabellen für Tausendergruppen und Nachkommastellen, damit die Spaltenfunktion
+    # keine Zahl einzeln in einen String umwandeln muss
+    import numpy as np
+    return (
+        np.array([str(number) for number in range(1000)]),
+        np.array([f"{number:03d}" for number in range(1000)]),
+        np.array([f",{number:02d}" for number in range(100)]),
+    )
+
+
+# --- Benutzerdefinierte Funktion für deutsche Zahlenformatierung ---
+def format_german_currency(value):
+    """
+    Formatiert einen Float-Wert als deutschen Währungsstring (z.B. 1.234.567,89).
+    Stellt sicher, dass das Komma als Dezimaltrennzeichen und der Punkt als Tausender-Trennzeichen verwendet wird.
+    """
+    if value is None or not math.isfinite(float(value)):
+        return "N/A"
+
+    # Zuerst als String mit zwei Nachkommastellen formatieren (Standardpunkt als Dezimaltrennzeichen)
+    temp_str = f"{float(value):.2f}"
+
+    # Teile in Ganzzahl- und Dezimalteil auf
+    parts = temp_str.split('.')
+    integer_part = parts[0]
+    decimal_part = parts[1]
+
+    # Tausender-Trennzeichen zum Ganzzahlteil hinzufügen
+    # Nutzt String-Formatierung mit Unterstrich als Trennzeichen, dann Ersetzung durch Punkt
+    formatted_integer_part = f"{int(integer_part):_}".replace("_", ".")
+
+    # Führt Ganzzahlteil und Dezimalteil mit Komma zusammen
+    return f"{formatted_integer_part},{decimal_part}"
+
+
+def format_german_currency_column(values):
+    """
+    Formatiert eine ganze Spalte (NumPy-Array, pandas Series oder Liste) auf einmal
+    als deutsche Währungsstrings. Das Ergebnis ist für jeden Wert identisch mit
+    format_german_currency; None, NaN und unendliche Werte werden zu "N/A".
+    Gibt für eine Series eine Series mit gleichem Index zurück, sonst ein NumPy-Array.
+    """
+    import numpy as np
+    import pandas as pd
+    groups, groups_padded, decimals = _lookup_tables()
+
+    index = values.index if isinstance(values, pd.Series) else None
+    numbers = np.asarray(values)
+    if numbers.dtype.kind not in "iuf":
+        # Gemischte Eingaben (z.B. mit None) erst in Zahlen umwandeln; None wird zu NaN
+        numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy()
+    numbers = numbers.astype(float)
+
+    missing = ~np.isfinite(numbers)
+    safe = np.where(missing, 0.0, numbers)
+    scaled = safe * 100
+    cents = np.rint(scaled)
+    # Werte (fast) genau auf einem halben Cent rundet die skalare Funktion anhand der exakten
+    # Binärdarstellung, die Multiplikation mit 100 kann dort aber um einige ULP abweichen.
+    # Diese wenigen Werte (und zu große Beträge) werden daher einzeln formatiert.
+    tolerance = np.maximum(1e-6, 4 * np.spacing(np.abs(scaled)))
+    needs_scalar = ~missing & (
+        (np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < tolerance) |
+        (np.abs(safe) >= _VECTORIZED_MAX_ABS_VALUE)
+    )
+
+    abs_cents = np.abs(np.where(needs_scalar, 0.0, cents)).astype(np.int64)
+    integer_part = abs_cents // 100
+
+    # Tausendergruppen von rechts nach links anhängen; nur die linke Gruppe bleibt ungepolstert
+    group = integer_part % 1000
+    grouped = np.full(len(integer_part), "", dtype="<U20")
+    rest = integer_part // 1000
+    while (rest > 0).any():
+        has_more = rest > 0
+        grouped = np.where(has_more, np.char.add(np.char.add(".", groups_padded[group]), grouped), grouped)
+        group = np.where(has_more, rest % 1000, group)
+        rest = rest // 1000
+
+    # Wie die skalare Funktion: das Minus verschwindet, wenn der Ganzzahlteil 0 ist (int("-0") == 0)
+    sign = np.where((cents < 0) & (integer_part > 0), "-", "")
+    result = np.char.add(np.char.add(sign, groups[group]), np.char.add(grouped, decimals[abs_cents % 100])).astype(object)
+
+    result[missing] = "N/A"
+    for position in np.flatnonzero(needs_scalar):
+        result[position] = format_german_currency(numbers[position])
+
+    if index is not None:
+        return pd.Series(result, index=index)
+    return result
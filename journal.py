@@ -0,0 +1,230 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Ohne fcntl (Windows) schützt nur die Sperre innerhalb des Prozesses
+    fcntl = None
+
+from sqlalchemy.exc import OperationalError
+
+import metrics
+from database import SessionLocal, add_survey_entries, add_survey_entry, is_lock_error, lock_timeout_session
+
+# Nach einem Eintrag noch kurz auf weitere warten, damit sie gemeinsam committet werden
+DEFAULT_BATCH_WAIT_SECONDS = 0.05
+# Spätestens so oft wird das Journal auch ohne neuen Eintrag geprüft (z.B. nach einem Datenbankfehler)
+DEFAULT_REPLAY_INTERVAL_SECONDS = 5.0
+# Höchstens so viele Einsendungen je Transaktion
+REPLAY_BATCH_SIZE = 500
+# So lange wartet eine Einsendung höchstens auf eine gesperrte Datenbank, bevor sie ins Journal geht
+DEFAULT_FALLBACK_SECONDS = 2.0
+
+DEFAULT_JOURNAL_DIR = "./journal"
+JOURNAL_FILENAME = "submissions.jsonl"
+LOCK_FILENAME = "submissions.lock"
+REPLAY_LOCK_FILENAME = "replay.lock"
+
+
+class SubmissionJournal:
+    """
+    Dauerhaftes Append-only-Journal für Umfrage-Einsendungen.
+    append schreibt eine Einsendung als JSON-Zeile und wartet auf fsync; danach ist sie auch
+    nach einem Absturz sicher. Ein Hintergrund-Thread überträgt die Einsendungen gebündelt nach
+    'survey_entries'. Über das Einmal-Token wird jede Einsendung genau einmal gespeichert, auch
+    wenn das Übertragen nach einem Absturz wiederholt wird.
+
+    Zum Übertragen wird das Journal unter einer Dateisperre umbenannt (…replay.jsonl) und neu
+    begonnen; eine umbenannte Datei wird erst gelöscht, wenn ihr Inhalt committet ist. App und
+    survey_api.py teilen sich das Verzeichnis; übertragen wird immer nur von einem Prozess.
+    """
+
+    def __init__(self, directory, session_factory=SessionLocal,
+                 batch_wait_seconds=DEFAULT_BATCH_WAIT_SECONDS,
+                 replay_interval_seconds=DEFAULT_REPLAY_INTERVAL_SECONDS):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._path = os.path.join(directory, JOURNAL_FILENAME)
+        self._lock_path = os.path.join(directory, LOCK_FILENAME)
+        self._replay_lock_path = os.path.join(directory, REPLAY_LOCK_FILENAME)
+        self._session_factory = session_factory
+        self._batch_wait_seconds = batch_wait_seconds
+        self._replay_interval_seconds = replay_interval_seconds
+        self._append_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._replayer = threading.Thread(target=self._run, name="survey-journal-replay", daemon=True)
+        self._replayer.start()
+
+    def append(self, volume, campaign, submission_token=None):
+        """
+        Schreibt eine Einsendung dauerhaft ins Journal und gibt ihr Einmal-Token zurück
+        (ein neues, falls keines übergeben wurde). Die Eintrags-ID gibt es erst nach dem
+        Übertragen, siehe database.get_entry_id_for_token.
+        """
+        submission_token = submission_token or str(uuid.uuid4())
+        line = json.dumps({
+            "token": submission_token,
+            "volume": volume,
+            "campaign": campaign,
+            "submitted_at": datetime.now().isoformat(),
+        }) + "\n"
+        with self._append_lock, self._file_lock(self._lock_path):
+            descriptor = os.open(self._path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                self._terminate_partial_line(descriptor)
+                os.write(descriptor, line.encode("utf-8"))
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+        metrics.increment("journal_appends_total")
+        self._wakeup.set()
+        return submission_token
+
+    def save(self, volume, campaign, submission_token, fallback_seconds=DEFAULT_FALLBACK_SECONDS):
+        """
+        Speichert eine Einsendung direkt in der Datenbank. Ist die Datenbank länger als
+        'fallback_seconds' gesperrt, wird sie stattdessen ins Journal geschrieben; der Gast wartet
+        also nie auf den vollen Busy-Timeout. Gibt die Eintrags-ID zurück oder None, wenn die
+        Einsendung (noch) nur im Journal liegt.
+        """
+        try:
+            with lock_timeout_session(fallback_seconds, self._session_factory) as db_session:
+                return add_survey_entry(db_session, volume, campaign, submission_token)
+        except OperationalError as e:
+            if not is_lock_error(e):
+                raise
+        self.append(volume, campaign, submission_token)
+        metrics.increment("journal_fallbacks_total")
+        return None
+
+    def pending(self):
+        """
+        Gibt die Zahl der Einsendungen zurück, die noch nicht übertragen wurden.
+        """
+        count = 0
+        for path in self._replay_files() + [self._path]:
+            try:
+                with open(path, "rb") as journal_file:
+                    count += sum(1 for line in journal_file if line.endswith(b"\n"))
+            except FileNotFoundError:
+                pass
+        return count
+
+    def replay(self):
+        """
+        Überträgt alle Einsendungen aus dem Journal in die Datenbank und gibt ihre Anzahl zurück.
+        Schlägt das Schreiben fehl, bleiben sie im Journal und der Fehler wird weitergereicht.
+        """
+        with self._replay_lock, self._file_lock(self._replay_lock_path):
+            self._rotate()
+            replayed = 0
+            for path in self._replay_files():
+                replayed += self._replay_file(path)
+            return replayed
+
+    def stop(self):
+        """
+        Beendet den Hintergrund-Thread, nachdem das Journal ein letztes Mal übertragen wurde.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        self._replayer.join()
+
+    @contextmanager
+    def _file_lock(self, path):
+        # Sperrt auch gegenüber anderen Prozessen im selben Verzeichnis: submissions.lock das
+        # Anhängen und Umbenennen, replay.lock das Übertragen
+        with open(path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _replay_files(self):
+        return sorted(glob.glob(os.path.join(self._directory, "submissions.*.replay.jsonl")))
+
+    @staticmethod
+    def _terminate_partial_line(descriptor):
+        # Nach einem Absturz mitten im Schreiben endet die Datei ohne Zeilenumbruch. Ohne eigenen
+        # Umbruch verschmölze die nächste Einsendung mit dem Rest zu einer unlesbaren Zeile.
+        size = os.fstat(descriptor).st_size
+        if size > 0 and os.pread(descriptor, 1, size - 1) != b"\n":
+            os.write(descriptor, b"\n")
+
+    def _rotate(self):
+        with self._append_lock, self._file_lock(self._lock_path):
+            if os.path.exists(self._path) and os.path.getsize(self._path) > 0:
+                descriptor = os.open(self._path, os.O_RDWR | os.O_APPEND)
+                try:
+                    self._terminate_partial_line(descriptor)
+                    os.fsync(descriptor)
+                finally:
+                    os.close(descriptor)
+                # Zeitstempel im Namen hält die Reihenfolge der umbenannten Dateien fest
+                os.rename(self._path, os.path.join(self._directory, f"submissions.{time.time_ns()}.replay.jsonl"))
+
+    def _read_records(self, path):
+        records = []
+        with open(path, "rb") as journal_file:
+            for line in journal_file:
+                if not line.endswith(b"\n"):
+                    # Beim Absturz abgebrochene Zeile: fsync wurde nie bestätigt, also auch nicht die Einsendung
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    metrics.increment("journal_corrupt_records_total")
+        return records
+
+    def _replay_file(self, path):
+        try:
+            records = self._read_records(path)
+        except FileNotFoundError:
+            # Ohne fcntl kann ein anderer Prozess die Datei schon übertragen haben
+            return 0
+        by_campaign = {}
+        for record in records:
+            by_campaign.setdefault(record["campaign"], []).append(record)
+        for campaign, campaign_records in by_campaign.items():
+            for start in range(0, len(campaign_records), REPLAY_BATCH_SIZE):
+                batch = campaign_records[start:start + REPLAY_BATCH_SIZE]
+                db_session = self._session_factory()
+                try:
+                    add_survey_entries(db_session, [record["volume"] for record in batch], campaign=campaign,
+                                       submission_tokens=[record["token"] for record in batch])
+                except Exception:
+                    db_session.rollback()
+                    raise
+                finally:
+                    db_session.close()
+        # Erst nach dem Commit löschen; bricht der Prozess vorher ab, verhindern die Token doppelte Einträge
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        metrics.increment("journal_replayed_total", len(records))
+        return len(records)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._replay_interval_seconds)
+            self._wakeup.clear()
+            stopping = self._stopped.is_set()
+            if not stopping:
+                # Weitere Einsendungen der nächsten Millisekunden gemeinsam übertragen
+                time.sleep(self._batch_wait_seconds)
+            try:
+                self.replay()
+            except Exception:
+                # Z.B. Datenbank gesperrt: die Einsendungen bleiben im Journal, nächster Versuch später
+                metrics.increment("journal_replay_errors_total")
+            if stopping:
+                break
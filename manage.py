@@ -0,0 +1,117 @@
+"""
+Wartungsbefehle für die Umfrage-Datenbank.
+
+Aufruf:
+    python manage.py reconcile [--repair] [--campaign NAME]
+    python manage.py archive [--campaign NAME] [--before JJJJ-MM-TT]
+    python manage.py replay-journal [--dir VERZEICHNIS]
+    python manage.py snapshot
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from archive import archive_entries, get_archive_files
+from database import DEFAULT_CAMPAIGN, SessionLocal, create_db_tables, reconcile_total_sum
+from formatting import format_german_currency
+from journal import DEFAULT_JOURNAL_DIR, SubmissionJournal
+from reporting import ReportingSnapshot
+
+
+def reconcile(args):
+    """
+    Prüft den Checkpoint der Live-Summe einer Kampagne gegen die vollständige Summe der Einträge.
+    """
+    db_session = SessionLocal()
+    try:
+        result = reconcile_total_sum(db_session, repair=args.repair, campaign=args.campaign)
+    finally:
+        db_session.close()
+    if result is None:
+        print(f"Keine Epoche für Kampagne '{args.campaign}' vorhanden.")
+        return 1
+    print(f"Kampagne {args.campaign}, Epoche {result['epoch_id']}, Checkpoint bis Eintrag {result['checkpoint_entry_id']}")
+    print(f"Checkpoint-Summe: {format_german_currency(result['checkpoint_sum'])} €")
+    print(f"Vollständige Summe: {format_german_currency(result['full_sum'])} €")
+    if result["consistent"]:
+        print("OK")
+        return 0
+    print(f"Abweichung: {format_german_currency(result['difference'])} €" + (" (korrigiert)" if args.repair else ""))
+    return 0 if args.repair else 1
+
+
+def archive(args):
+    """
+    Verschiebt die Einträge abgeschlossener Epochen einer Kampagne ins Parquet-Archiv.
+    """
+    before = datetime.fromisoformat(args.before) if args.before else None
+    db_session = SessionLocal()
+    try:
+        result = archive_entries(db_session, campaign=args.campaign, before=before)
+    finally:
+        db_session.close()
+    if result is None:
+        print(f"Kampagne {args.campaign}: keine Einträge abgeschlossener Epochen zu archivieren.")
+    else:
+        print(f"Kampagne {args.campaign}: {result['entries']} Einträge (ID {result['first_entry_id']} bis "
+              f"{result['last_entry_id']}) archiviert nach {result['path']}")
+    files = get_archive_files(args.campaign)
+    print(f"Archiv: {len(files)} Dateien, {sum(file['entries'] for file in files)} Einträge, "
+          f"{sum(file['bytes'] for file in files) / 2**20:.1f} MiB")
+    return 0
+
+
+def replay_journal(args):
+    """
+    Überträgt Einsendungen aus dem Journal in die Datenbank (z.B. nach einem Absturz, ohne die App zu starten).
+    """
+    journal = SubmissionJournal(args.dir)
+    try:
+        replayed = journal.replay()
+    finally:
+        journal.stop()
+    print(f"{replayed} Einsendungen aus dem Journal übertragen, {journal.pending()} verbleiben.")
+    return 0 if journal.pending() == 0 else 1
+
+
+def snapshot(args):
+    """
+    Erneuert die Kopie der SQLite-Datenbank für Admin-Listen und Exporte (z.B. regelmäßig per cron).
+    """
+    reporting_snapshot = ReportingSnapshot()
+    if not reporting_snapshot.enabled:
+        print("Keine SQLite-Datenbankdatei: der Admin-Bereich liest direkt aus der Datenbank.")
+        return 0
+    reporting_snapshot.refresh()
+    print(f"Kopie erneuert: {reporting_snapshot.path}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wartungsbefehle für die Umfrage-Datenbank")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconcile_parser = subparsers.add_parser("reconcile", help=reconcile.__doc__)
+    reconcile_parser.add_argument("--repair", action="store_true", help="Checkpoint bei Abweichung korrigieren")
+    reconcile_parser.add_argument("--campaign", default=DEFAULT_CAMPAIGN, help="Kampagne (Standard: default)")
+    reconcile_parser.set_defaults(func=reconcile)
+
+    archive_parser = subparsers.add_parser("archive", help=archive.__doc__)
+    archive_parser.add_argument("--campaign", default=DEFAULT_CAMPAIGN, help="Kampagne (Standard: default)")
+    archive_parser.add_argument("--before", help="Nur Einträge vor diesem Zeitpunkt (ISO-Format, z.B. 2025-06-01)")
+    archive_parser.set_defaults(func=archive)
+
+    replay_parser = subparsers.add_parser("replay-journal", help=replay_journal.__doc__)
+    replay_parser.add_argument("--dir", default=DEFAULT_JOURNAL_DIR, help=f"Journal-Verzeichnis (Standard: {DEFAULT_JOURNAL_DIR})")
+    replay_parser.set_defaults(func=replay_journal)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help=snapshot.__doc__)
+    snapshot_parser.set_defaults(func=snapshot)
+
+    args = parser.parse_args()
+    create_db_tables()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Prozessweite Messwerte (Zähler und Laufzeiten) für die Umfrage-App.
+
+Das Erfassen kostet nur eine Sperre und ein paar Additionen; ausgewertet wird erst,
+wenn jemand die Werte abruft (Admin-Bereich oder Prometheus-Textformat).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Alle Messwerte erhalten dieses Präfix im Prometheus-Textformat
+METRIC_PREFIX = "umfrage_"
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+TIMING_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HELP = {
+    "db_queries": "Laufzeit der SQL-Anweisungen nach Art der Anweisung",
+    "db_errors_total": "Fehlgeschlagene SQL-Anweisungen",
+    "db_lock_errors_total": "SQL-Anweisungen, die an einer Sperre gescheitert sind (database is locked)",
+    "db_lock_retries_total": "Wegen einer Sperre verschobene Arbeiten, die später erneut versucht werden",
+    "page_render": "Laufzeit eines Skriptdurchlaufs je Seite",
+    "fragment_render": "Laufzeit eines Fragment-Durchlaufs",
+    "qr_render": "Laufzeit für den QR-Code der Präsentationsansicht",
+    "archived_entries_total": "Ins Parquet-Archiv verschobene Einträge",
+    "journal_appends_total": "Ins Journal geschriebene Einsendungen",
+    "journal_fallbacks_total": "Einsendungen, die wegen einer Datenbanksperre ins Journal ausgewichen sind",
+    "journal_replayed_total": "Aus dem Journal in die Datenbank übertragene Einsendungen",
+    "journal_replay_errors_total": "Fehlgeschlagene Übertragungen aus dem Journal (werden wiederholt)",
+    "journal_corrupt_records_total": "Unlesbare Zeilen im Journal",
+    "api_request": "Laufzeit der Anfragen an survey_api.py je Route",
+    "api_errors_total": "Anfragen an survey_api.py, die mit einem Fehler abgebrochen sind",
+    "reporting_snapshot_refresh": "Dauer einer neuen Kopie der Datenbank für den Admin-Bereich",
+    "reporting_snapshot_errors_total": "Fehlgeschlagene Kopien der Datenbank für den Admin-Bereich",
+}
+
+_lock = threading.Lock()
+_counters = {}  # (Name, Labels) -> Wert
+_timings = {}   # (Name, Labels) -> [Anzahl, Summe, Maximum, Bucket-Zähler]
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def increment(name, amount=1, **labels):
+    """
+    Erhöht einen Zähler. Zählernamen enden nach Prometheus-Konvention auf '_total'.
+    """
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    """
+    Erfasst eine gemessene Laufzeit in Sekunden.
+    """
+    key = _key(name, labels)
+    with _lock:
+        timing = _timings.get(key)
+        if timing is None:
+            timing = _timings[key] = [0, 0.0, 0.0, [0] * len(TIMING_BUCKETS)]
+        timing[0] += 1
+        timing[1] += seconds
+        if seconds > timing[2]:
+            timing[2] = seconds
+        for position, upper_bound in enumerate(TIMING_BUCKETS):
+            if seconds <= upper_bound:
+                timing[3][position] += 1
+                break
+
+
+@contextmanager
+def timed(name, **labels):
+    """
+    Misst die Laufzeit des Blocks, auch wenn er per Ausnahme verlassen wird
+    (z.B. durch st.rerun() oder st.stop()).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def snapshot():
+    """
+    Gibt (Zähler, Laufzeiten) als Listen von Dicts zurück, sortiert nach Name und Labels.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        timings = sorted((key, (count, total, maximum)) for key, (count, total, maximum, _) in _timings.items())
+    return (
+        [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters],
+        [{"name": name, "labels": dict(labels), "count": count, "sum_seconds": total,
+          "max_seconds": maximum, "avg_seconds": total / count if count else 0.0}
+         for (name, labels), (count, total, maximum) in timings],
+    )
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in pairs) + "}"
+
+
+def prometheus_text():
+    """
+    Gibt alle Messwerte im Prometheus-Textformat (Version 0.0.4) zurück.
+    Laufzeiten erscheinen als Histogramm mit der Einheit Sekunden.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        timings = sorted((key, (count, total, list(buckets))) for key, (count, total, _, buckets) in _timings.items())
+
+    lines = []
+    described = set()
+    for (name, labels), value in counters:
+        metric = METRIC_PREFIX + name
+        if metric not in described:
+            described.add(metric)
+            if name in _HELP:
+                lines.append(f"# HELP {metric} {_HELP[name]}")
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    for (name, labels), (count, total, buckets) in timings:
+        metric = f"{METRIC_PREFIX}{name}_seconds"
+        if metric not in described:
+            described.add(metric)
+            if name in _HELP:
+                lines.append(f"# HELP {metric} {_HELP[name]}")
+            lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for upper_bound, bucket_count in zip(TIMING_BUCKETS, buckets):
+            cumulative += bucket_count
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', upper_bound)])} {cumulative}")
+        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """
+    Verwirft alle bisher erfassten Messwerte.
+    """
+    with _lock:
+        _counters.clear()
+        _timings.clear()
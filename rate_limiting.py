@@ -0,0 +1,57 @@
+import threading
+import time
+
+# Buckets, die so lange unbenutzt waren, werden beim Aufräumen verworfen (sie wären ohnehin wieder voll)
+IDLE_BUCKET_SECONDS = 600
+
+
+class RateLimiter:
+    """
+    In-Prozess-Ratenbegrenzung nach dem Token-Bucket-Verfahren.
+    Jeder Schlüssel (z.B. Session oder IP-Adresse) hat einen eigenen Bucket mit
+    'capacity' Token, der sich mit 'refill_per_second' Token pro Sekunde wieder füllt.
+    Jede Anfrage verbraucht ein Token; ist der Bucket leer, wird sie abgewiesen.
+    """
+
+    def __init__(self, capacity, refill_per_second, clock=time.monotonic):
+        self._capacity = float(capacity)
+        self._refill_per_second = float(refill_per_second)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}  # Schlüssel -> (verbleibende Token, Zeitpunkt der letzten Anfrage)
+        self._next_cleanup = clock() + IDLE_BUCKET_SECONDS
+
+    def allow(self, key):
+        """
+        Verbraucht ein Token für 'key'. Gibt True zurück, wenn die Anfrage erlaubt ist.
+        """
+        now = self._clock()
+        with self._lock:
+            if now >= self._next_cleanup:
+                self._remove_idle_buckets(now)
+            tokens, last_seen = self._buckets.get(key, (self._capacity, now))
+            tokens = min(self._capacity, tokens + (now - last_seen) * self._refill_per_second)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            return allowed
+
+    def retry_after(self, key):
+        """
+        Gibt die Sekunden zurück, bis für 'key' wieder eine Anfrage erlaubt ist (0, wenn sofort).
+        """
+        now = self._clock()
+        with self._lock:
+            tokens, last_seen = self._buckets.get(key, (self._capacity, now))
+        tokens = min(self._capacity, tokens + (now - last_seen) * self._refill_per_second)
+        if tokens >= 1.0 or self._refill_per_second <= 0:
+            return 0.0
+        return (1.0 - tokens) / self._refill_per_second
+
+    def _remove_idle_buckets(self, now):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < IDLE_BUCKET_SECONDS
+        }
+        self._next_cleanup = now + IDLE_BUCKET_SECONDS
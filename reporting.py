@@ -0,0 +1,118 @@
+"""
+Schnappschuss der Datenbank für Admin-Listen und Exporte.
+
+Während einer Veranstaltung schreiben die Gäste laufend in 'umfrage_data.db'. Lange Lesezugriffe
+des Admin-Bereichs (seitenweise Listen, CSV- und Parquet-Exporte) laufen deshalb bei SQLite
+gegen eine Kopie: ReportingSnapshot kopiert die Datenbank mit der Online-Backup-API von SQLite
+in eine eigene Datei. Die Kopie liest alle Seiten in einer einzigen Lesetransaktion; im
+WAL-Modus schreiben die Gäste währenddessen ungehindert weiter. Eine Schreibsperre auf der
+Live-Datenbank wird nie genommen. Ist die Kopie älter als REPORTING_SNAPSHOT_MAX_AGE_SECONDS,
+wird sie beim nächsten Zugriff erneuert.
+
+Datenbankserver wie PostgreSQL lassen Leser ohnehin nicht auf Schreiber warten; dort lesen die
+Admin-Listen direkt aus der Live-Datenbank.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import metrics
+from database import REPORTING_SNAPSHOT_MAX_AGE_SECONDS, REPORTING_SNAPSHOT_PATH, SessionLocal, engine
+
+
+class ReportingSnapshot:
+    """
+    Verwaltet die Kopie der Live-Datenbank für den Admin-Bereich. session() liefert eine
+    Session auf die Kopie und erneuert sie vorher, falls sie fehlt oder zu alt ist.
+    Mehrere Threads teilen sich eine Instanz; erneuert wird immer nur von einem.
+    """
+
+    def __init__(self, path=REPORTING_SNAPSHOT_PATH, max_age_seconds=REPORTING_SNAPSHOT_MAX_AGE_SECONDS,
+                 live_engine=engine):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._live_engine = live_engine
+        # Nur dateibasiertes SQLite profitiert von der Kopie
+        self.enabled = live_engine.dialect.name == "sqlite" and live_engine.url.database not in (None, "", ":memory:")
+        self._refresh_lock = threading.Lock()
+        self._session_factory = None
+        if self.enabled:
+            # Ohne Pool öffnet jede Session die jeweils aktuelle Datei; 'mode=ro' schützt die Kopie
+            snapshot_engine = create_engine(f"sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true",
+                                            poolclass=NullPool)
+            self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=snapshot_engine)
+
+    def taken_at(self):
+        """
+        Gibt den Zeitpunkt (Unix-Zeit) zurück, zu dem die Kopie gelesen wurde, oder None ohne Kopie.
+        """
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def age_seconds(self):
+        """
+        Gibt das Alter der Kopie in Sekunden zurück oder None, wenn es noch keine gibt.
+        """
+        taken_at = self.taken_at()
+        return None if taken_at is None else max(0.0, time.time() - taken_at)
+
+    def refresh(self, max_age_seconds=0):
+        """
+        Erneuert die Kopie, wenn sie älter als 'max_age_seconds' ist (Standard: immer).
+        Gibt True zurück, wenn neu kopiert wurde.
+        """
+        with self._refresh_lock:
+            # Ein anderer Thread hat die Kopie vielleicht gerade erneuert
+            age = self.age_seconds()
+            if age is not None and age < max_age_seconds:
+                return False
+            with metrics.timed("reporting_snapshot_refresh"):
+                self._copy()
+            return True
+
+    def session(self):
+        """
+        Liefert eine Session für lesende Admin-Abfragen: auf die Kopie, wenn sie aktiv ist,
+        sonst auf die Live-Datenbank. Schlägt das Erneuern fehl, wird die vorhandene Kopie
+        weiterverwendet; gibt es keine, wird aus der Live-Datenbank gelesen.
+        """
+        if not self.enabled:
+            return SessionLocal()
+        try:
+            self.refresh(self.max_age_seconds)
+        except (OSError, sqlite3.Error):
+            metrics.increment("reporting_snapshot_errors_total")
+            if self.taken_at() is None:
+                return SessionLocal()
+        return self._session_factory()
+
+    def _copy(self):
+        started_at = time.time()
+        temporary_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        source = self._live_engine.raw_connection()
+        try:
+            target = sqlite3.connect(temporary_path)
+            try:
+                # pages=-1: alle Seiten in einer Lesetransaktion, dadurch ein konsistenter Stand
+                source.driver_connection.backup(target, pages=-1)
+                # Die Kopie übernimmt sonst den WAL-Modus und bräuchte zum Lesen -wal/-shm-Dateien
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+            # Das Alter der Kopie bezieht sich auf den Beginn des Lesens, nicht auf das Ende
+            os.utime(temporary_path, (started_at, started_at))
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        finally:
+            # Lesetransaktion der Live-Verbindung beenden, bevor sie zurück in den Pool geht
+            source.close()
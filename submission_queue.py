@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import DEFAULT_CAMPAIGN, SessionLocal, add_survey_entries
+
+# Standardwerte für das Bündeln: spätestens alle 50 ms oder sobald 100 Einträge warten
+DEFAULT_MAX_WAIT_SECONDS = 0.05
+DEFAULT_MAX_BATCH_SIZE = 100
+
+
+class SubmissionQueue:
+    """
+    In-Prozess-Warteschlange für Umfrage-Einsendungen.
+    Ein Hintergrund-Thread sammelt die eingehenden Volumen und schreibt sie
+    gebündelt in einer einzigen Transaktion (Group Commit), statt für jede
+    Einsendung einen eigenen Commit samt fsync zu bezahlen.
+    """
+
+    def __init__(self, session_factory=SessionLocal,
+                 max_wait_seconds=DEFAULT_MAX_WAIT_SECONDS,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        self._session_factory = session_factory
+        self._max_wait_seconds = max_wait_seconds
+        self._max_batch_size = max_batch_size
+        self._pending = queue.Queue()
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="survey-group-commit", daemon=True)
+        self._writer.start()
+
+    def submit(self, volume, campaign=DEFAULT_CAMPAIGN, submission_token=None, timeout=None):
+        """
+        Reiht ein Volumen für eine Kampagne ein und wartet, bis es committet ist.
+        Gibt die echte ID des neuen Eintrags zurück (wie add_survey_entry, auch für
+        bereits gespeicherte Einmal-Token).
+        Fehler beim Schreiben werden an den Aufrufer weitergereicht.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Die Einsende-Warteschlange wurde bereits beendet.")
+        future = Future()
+        self._pending.put((volume, campaign, submission_token, future))
+        return future.result(timeout=timeout)
+
+    def stop(self):
+        """
+        Beendet den Hintergrund-Thread, nachdem alle wartenden Einträge geschrieben wurden.
+        """
+        self._stopped.set()
+        self._pending.put(None)
+        self._writer.join()
+
+    def _collect_batch(self):
+        # Blockierend auf den ersten Eintrag warten, danach bis zur Frist weitere einsammeln
+        first = self._pending.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self._max_wait_seconds
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Stopp-Signal: aktuellen Stapel noch schreiben, danach beenden
+                self._pending.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _write_batch(self, batch):
+        # Ein Stapel kann Einträge mehrerer Kampagnen enthalten: je Kampagne eine Transaktion
+        by_campaign = {}
+        for volume, campaign, submission_token, future in batch:
+            by_campaign.setdefault(campaign, []).append((volume, submission_token, future))
+        for campaign, items in by_campaign.items():
+            self._write_campaign_batch(campaign, items)
+
+    def _write_campaign_batch(self, campaign, items):
+        db_session = None
+        try:
+            # Auch das Öffnen der Session kann fehlschlagen (z.B. Datenbankserver nicht erreichbar)
+            db_session = self._session_factory()
+            entry_ids = add_survey_entries(
+                db_session, [volume for volume, _, _ in items], campaign=campaign,
+                submission_tokens=[submission_token for _, submission_token, _ in items]
+            )
+        except Exception as e:
+            if db_session is not None:
+                db_session.rollback()
+            self._fail(items, e)
+            return
+        finally:
+            if db_session is not None:
+                db_session.close()
+        for (_, _, future), entry_id in zip(items, entry_ids):
+            future.set_result(entry_id)
+
+    @staticmethod
+    def _fail(items, error):
+        # Gibt den Fehler an alle Einsendungen weiter, die noch auf ihr Ergebnis warten
+        for item in items:
+            future = item[-1]
+            if not future.done():
+                future.set_exception(error)
+
+    def _write_batch_safely(self, batch):
+        # Ein Fehler beim Bündeln oder Schreiben darf den Schreib-Thread nicht beenden, sonst
+        # warteten alle folgenden submit-Aufrufe (ohne timeout) für immer
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            self._fail(batch, e)
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if not batch:
+                break
+            self._write_batch_safely(batch)
+        # Nach dem Stopp noch übrig gebliebene Einträge abarbeiten
+        leftovers = []
+        while True:
+            try:
+                item = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            self._write_batch_safely(leftovers)
@@ -0,0 +1,384 @@
+"""
+Schlanker HTTP-Endpunkt für das Umfrageformular auf dem Handy.
+
+Statt einer Streamlit-Session je Gast (Websocket, kompletter Skriptlauf, zwei Redirects)
+lädt das Handy eine statische Seite (static/umfrage.html, wenige KB) und sendet Betrag und
+Kontaktdaten mit je einem JSON-Request. Der Server läuft als eigener Prozess neben der
+Streamlit-App und nutzt dieselbe Datenbank.
+
+Aufruf:
+    python survey_api.py --port 8502
+
+Endpunkte:
+    GET  /                                  Umfrageseite (?campaign=NAME wie beim QR-Code der App)
+    POST /api/submissions                   {"volume": 12345.5, "campaign": "default", "token": "<uuid>"}
+    POST /api/submissions/<token>/contact   {"name": ..., "company": ..., "email": ..., "phone": ...}
+    GET  /api/total?campaign=NAME           {"campaign": ..., "total": ...}
+
+Die Messwerte dieses Prozesses (GET /metrics, Prometheus-Textformat) gibt es nur auf einem
+eigenen Port, der ausschließlich an 127.0.0.1 gebunden ist (--metrics-port, Standard 9502).
+
+Hinter einem Reverse-Proxy sieht der Server nur dessen Adresse. Mit --trusted-proxies
+(z.B. "127.0.0.1,10.0.0.0/8") gilt bei Anfragen von diesen Adressen die Client-Adresse aus
+X-Forwarded-For; sonst zählt die IP-Begrenzung alle Gäste als einen.
+"""
+import argparse
+import gzip
+import ipaddress
+import json
+import math
+import os
+import re
+import sys
+import threading
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from database import DEFAULT_CAMPAIGN, SessionLocal, add_survey_entry, create_db_tables, get_cached_total_sum, \
+                     get_entry_id_for_token, is_valid_campaign, update_survey_entry_with_contact
+from journal import DEFAULT_FALLBACK_SECONDS, DEFAULT_JOURNAL_DIR, SubmissionJournal
+from rate_limiting import RateLimiter
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SURVEY_PAGE_PATH = os.path.join(APP_DIR, "static", "umfrage.html")
+
+# Größere Anfragen sind nie ein Formular, sondern Missbrauch
+MAX_REQUEST_BYTES = 4096
+# Längere Kontaktangaben passen ohnehin nicht in die Spalten (String(255))
+MAX_CONTACT_FIELD_LENGTH = 255
+
+# Wie in der App: ein ganzer Saal scannt über dasselbe WLAN (eine IP-Adresse) fast gleichzeitig.
+# Die IP-Grenze fängt daher nur Fluten ab; 0 schaltet sie ab.
+DEFAULT_RATE_LIMIT_IP_PER_MINUTE = 1200
+DEFAULT_RATE_LIMIT_IP_BURST = 1000
+
+METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9502
+
+CONTACT_PATH = re.compile(r"^/api/submissions/([0-9a-f-]{36})/contact$")
+
+
+class SurveyRequestHandler(BaseHTTPRequestHandler):
+    """
+    Bearbeitet die Anfragen der Umfrageseite. Jede Anfrage läuft in einem eigenen Thread
+    mit einer eigenen Datenbank-Session.
+    """
+    server_version = "Umfrage"
+    # Keep-Alive, damit Seite und Einsendung über dieselbe Verbindung laufen können
+    protocol_version = "HTTP/1.1"
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except Exception as e:
+            # Z.B. Datenbank nicht erreichbar: dem Handy eine verständliche Antwort statt eines Verbindungsabbruchs
+            self.log_error("Fehler bei %s: %r", getattr(self, "path", "-"), e)
+            metrics.increment("api_errors_total")
+            self.close_connection = True
+            try:
+                self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, "Ein Fehler ist aufgetreten. Bitte versuchen Sie es erneut.")
+            except OSError:
+                pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path in ("/", "/umfrage"):
+            with metrics.timed("api_request", route="page"):
+                self._send_page()
+        elif url.path == "/api/total":
+            with metrics.timed("api_request", route="total"):
+                campaign = parse_qs(url.query).get("campaign", [DEFAULT_CAMPAIGN])[0]
+                if not is_valid_campaign(campaign):
+                    return self._send_error(HTTPStatus.BAD_REQUEST, "Ungültige Kampagne.")
+                self._send_json(HTTPStatus.OK, {"campaign": campaign, "total": get_cached_total_sum(campaign)})
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, "Nicht gefunden.")
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        contact_match = CONTACT_PATH.match(path)
+        if path == "/api/submissions":
+            with metrics.timed("api_request", route="submission"):
+                self._handle_submission()
+        elif contact_match:
+            with metrics.timed("api_request", route="contact"):
+                self._handle_contact(contact_match.group(1))
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, "Nicht gefunden.")
+
+    def _handle_submission(self):
+        if not self._rate_limit_allows(self.server.rate_limiter):
+            return
+        payload = self._read_json()
+        if payload is None:
+            return
+        try:
+            volume = float(payload.get("volume"))
+        except (TypeError, ValueError):
+            volume = None
+        if volume is None or not math.isfinite(volume) or volume < 0:
+            return self._send_error(HTTPStatus.BAD_REQUEST, "Bitte geben Sie einen gültigen Betrag ein.")
+        campaign = payload.get("campaign") or DEFAULT_CAMPAIGN
+        if not is_valid_campaign(campaign):
+            return self._send_error(HTTPStatus.BAD_REQUEST, "Ungültige Kampagne.")
+        submission_token = _parse_token(payload.get("token")) if payload.get("token") else str(uuid.uuid4())
+        if submission_token is None:
+            return self._send_error(HTTPStatus.BAD_REQUEST, "Ungültiges Token.")
+
+        if self.server.journal is not None:
+            # Ist die Datenbank länger als journal_fallback_seconds gesperrt, geht die Einsendung
+            # dauerhaft ins Journal und der Gast erhält trotzdem sofort seine Bestätigung
+            entry_id = self.server.journal.save(volume, campaign, submission_token, self.server.journal_fallback_seconds)
+        else:
+            db_session = SessionLocal()
+            try:
+                entry_id = add_survey_entry(db_session, volume, campaign, submission_token)
+            finally:
+                db_session.close()
+        self._send_json(HTTPStatus.CREATED, {"token": submission_token, "entry_id": entry_id})
+
+    def _handle_contact(self, submission_token):
+        if not self._rate_limit_allows(self.server.contact_rate_limiter):
+            return
+        submission_token = _parse_token(submission_token)
+        payload = self._read_json()
+        if payload is None:
+            return
+        if submission_token is None:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Unbekannte Einsendung.")
+        fields = []
+        for name in ("name", "company", "email", "phone"):
+            value = payload.get(name) or ""
+            if not isinstance(value, str):
+                return self._send_error(HTTPStatus.BAD_REQUEST, "Ungültige Kontaktdaten.")
+            # Leere Felder werden wie im Streamlit-Formular als None gespeichert
+            fields.append(value.strip()[:MAX_CONTACT_FIELD_LENGTH] or None)
+
+        db_session = SessionLocal()
+        try:
+            entry_id = get_entry_id_for_token(db_session, submission_token)
+            if entry_id is None and self.server.journal is not None and self.server.journal.pending() > 0:
+                # Die Einsendung liegt vielleicht noch im Journal: jetzt übertragen. Ist das Journal
+                # leer, ist das Token unbekannt und die Antwort kommt ohne Umweg über die Datenbank.
+                self.server.journal.replay()
+                entry_id = get_entry_id_for_token(db_session, submission_token)
+            if entry_id is None:
+                return self._send_error(HTTPStatus.NOT_FOUND, "Unbekannte Einsendung.")
+            update_survey_entry_with_contact(db_session, entry_id, *fields)
+        finally:
+            db_session.close()
+        self._send_json(HTTPStatus.OK, {"token": submission_token})
+
+    def _request_client_ip(self):
+        # Adresse des Gastes; hinter einem vertrauenswürdigen Proxy aus X-Forwarded-For
+        forwarded_for = ",".join(self.headers.get_all("X-Forwarded-For") or [])
+        return _client_ip(self.client_address[0], forwarded_for, self.server.trusted_proxies)
+
+    def _rate_limit_allows(self, rate_limiter):
+        # Sendet bei überschrittener Grenze selbst die Fehlerantwort und gibt False zurück
+        if rate_limiter is None:
+            return True
+        client_ip = self._request_client_ip()
+        if rate_limiter.allow(client_ip):
+            return True
+        # Der Body bleibt ungelesen und darf nicht als nächste Anfrage gelten
+        self.close_connection = True
+        self._send_error(HTTPStatus.TOO_MANY_REQUESTS, "Zu viele Einsendungen in kurzer Zeit. Bitte versuchen Sie es gleich erneut.",
+                         retry_after=rate_limiter.retry_after(client_ip))
+        return False
+
+    def _read_json(self):
+        # Gibt den JSON-Body als Dict zurück oder sendet selbst eine Fehlerantwort und gibt None zurück
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Anfrage zu groß.")
+            return None
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            self._send_error(HTTPStatus.BAD_REQUEST, "Ungültige Anfrage.")
+            return None
+        return payload
+
+    def _send_page(self):
+        page, page_gzip = self.server.survey_page
+        if page_gzip is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            return self._send(HTTPStatus.OK, page_gzip, "text/html; charset=utf-8",
+                              {"Content-Encoding": "gzip", "Vary": "Accept-Encoding", "Cache-Control": "public, max-age=300"})
+        self._send(HTTPStatus.OK, page, "text/html; charset=utf-8", {"Cache-Control": "public, max-age=300"})
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json", {"Cache-Control": "no-store"})
+
+    def _send_error(self, status, message, retry_after=None):
+        headers = {"Cache-Control": "no-store"}
+        if retry_after is not None:
+            headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        self._send(status, json.dumps({"error": message}).encode("utf-8"), "application/json", headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """
+    Liefert GET /metrics auf dem internen Port (nur 127.0.0.1).
+    """
+    server_version = "Umfrage"
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/metrics":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _parse_token(value):
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def parse_trusted_proxies(value):
+    """
+    Liest eine kommagetrennte Liste von IP-Adressen und Netzen ("127.0.0.1, 10.0.0.0/8").
+    """
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in (value or "").split(",") if item.strip())
+
+
+def _client_ip(peer, forwarded_for, trusted_proxies):
+    # Nur ein vertrauenswürdiger Proxy darf X-Forwarded-For setzen. Jeder Proxy hängt die Adresse
+    # an, von der er die Anfrage erhalten hat; die Kette wird daher von rechts gelesen, bis zur
+    # ersten Adresse, die kein eigener Proxy ist. Weiter links kann der Gast alles eintragen.
+    if not _is_trusted(peer, trusted_proxies):
+        return peer
+    client_ip = peer
+    for item in reversed(forwarded_for.split(",")):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            client_ip = str(ipaddress.ip_address(item))
+        except ValueError:
+            break
+        if not _is_trusted(client_ip, trusted_proxies):
+            break
+    return client_ip
+
+
+def _is_trusted(address, trusted_proxies):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies)
+
+
+def _rate_limiter(per_minute, burst):
+    return RateLimiter(burst, per_minute / 60) if per_minute > 0 and burst > 0 else None
+
+
+def _load_survey_page(path=SURVEY_PAGE_PATH):
+    # Einmal beim Start lesen und komprimieren; gzip lohnt sich erst ab einigen hundert Bytes
+    with open(path, "rb") as page_file:
+        page = page_file.read()
+    return page, gzip.compress(page, mtime=0) if len(page) > 512 else None
+
+
+def create_server(host, port, rate_limit_per_minute=DEFAULT_RATE_LIMIT_IP_PER_MINUTE,
+                  rate_limit_burst=DEFAULT_RATE_LIMIT_IP_BURST, journal_dir=None, trusted_proxies=(),
+                  journal_fallback_seconds=DEFAULT_FALLBACK_SECONDS):
+    """
+    Erstellt den HTTP-Server (noch nicht gestartet). Mit 'journal_dir' weichen Einsendungen
+    ins Journal aus, wenn die Datenbank länger als 'journal_fallback_seconds' gesperrt ist
+    (siehe journal.py). Einsendungen und Kontaktdaten haben je eine eigene IP-Grenze mit
+    denselben Werten.
+    """
+    server = ThreadingHTTPServer((host, port), SurveyRequestHandler)
+    server.daemon_threads = True
+    server.survey_page = _load_survey_page()
+    server.rate_limiter = _rate_limiter(rate_limit_per_minute, rate_limit_burst)
+    server.contact_rate_limiter = _rate_limiter(rate_limit_per_minute, rate_limit_burst)
+    server.trusted_proxies = tuple(trusted_proxies)
+    server.journal = SubmissionJournal(journal_dir) if journal_dir else None
+    server.journal_fallback_seconds = journal_fallback_seconds
+    return server
+
+
+def create_metrics_server(port, host=METRICS_HOST):
+    """
+    Erstellt den Server für GET /metrics (noch nicht gestartet), standardmäßig nur auf 127.0.0.1.
+    """
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schlanker HTTP-Endpunkt für das Umfrageformular")
+    parser.add_argument("--host", default=os.environ.get("SURVEY_API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SURVEY_API_PORT", 8502)))
+    parser.add_argument("--rate-limit-per-minute", type=float,
+                        default=float(os.environ.get("RATE_LIMIT_IP_PER_MINUTE", DEFAULT_RATE_LIMIT_IP_PER_MINUTE)),
+                        help="Anfragen pro Minute und IP-Adresse nach dem Burst (Standard 1200, wie in der App; 0 schaltet die Grenze ab)")
+    parser.add_argument("--rate-limit-burst", type=float,
+                        default=float(os.environ.get("RATE_LIMIT_IP_BURST", DEFAULT_RATE_LIMIT_IP_BURST)),
+                        help="So viele Anfragen darf eine IP-Adresse auf einmal schicken (Standard 1000, wie in der App)")
+    parser.add_argument("--trusted-proxies", default=os.environ.get("SURVEY_API_TRUSTED_PROXIES", ""),
+                        help="Adressen oder Netze der eigenen Reverse-Proxys, deren X-Forwarded-For gilt (kommagetrennt)")
+    parser.add_argument("--metrics-port", type=int, default=int(os.environ.get("SURVEY_API_METRICS_PORT", DEFAULT_METRICS_PORT)),
+                        help="Port für GET /metrics, nur auf 127.0.0.1 (Standard 9502; 0 schaltet ihn ab)")
+    parser.add_argument("--journal-dir", default=os.environ.get("SUBMISSION_JOURNAL_DIR", DEFAULT_JOURNAL_DIR),
+                        help="Journal bei gesperrter Datenbank; leer lassen, um es abzuschalten")
+    parser.add_argument("--journal-fallback-seconds", type=float,
+                        default=float(os.environ.get("SUBMISSION_JOURNAL_FALLBACK_SECONDS", DEFAULT_FALLBACK_SECONDS)),
+                        help="So lange wartet eine Einsendung höchstens auf die gesperrte Datenbank (Standard 2, wie in der App)")
+    args = parser.parse_args()
+
+    create_db_tables()
+    server = create_server(args.host, args.port, args.rate_limit_per_minute, args.rate_limit_burst,
+                           args.journal_dir or None, parse_trusted_proxies(args.trusted_proxies),
+                           args.journal_fallback_seconds)
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = create_metrics_server(args.metrics_port)
+        threading.Thread(target=metrics_server.serve_forever, name="survey-api-metrics", daemon=True).start()
+        print(f"Messwerte unter http://{METRICS_HOST}:{args.metrics_port}/metrics")
+    print(f"Umfrage-Endpunkt läuft auf http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        if server.journal is not None:
+            server.journal.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
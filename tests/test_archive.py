@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, update
+
+import archive
+import database
+from database import SurveyEntry
+
+
+def _age_entries(db_session, first_id, last_id, age):
+    db_session.execute(
+        update(SurveyEntry).where(SurveyEntry.id.between(first_id, last_id)).values(timestamp=datetime.now() - age)
+    )
+    db_session.commit()
+
+
+def _crash_before_delete(*args, **kwargs):
+    raise RuntimeError("Absturz vor dem Löschen")
+
+
+@pytest.fixture
+def completed_epoch(db_session):
+    # Zehn Einträge einer abgeschlossenen Epoche (1-5 drei, 6-10 zwei Stunden alt) und zwei der laufenden
+    database.add_survey_entries(db_session, [float(index) for index in range(1, 11)])
+    _age_entries(db_session, 1, 5, timedelta(hours=3))
+    _age_entries(db_session, 6, 10, timedelta(hours=2))
+    database.reset_total_sum(db_session)
+    database.add_survey_entries(db_session, [100.0, 200.0])
+    return db_session
+
+
+def test_archive_moves_completed_epoch(completed_epoch, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    result = archive.archive_entries(completed_epoch, archive_dir=archive_dir)
+
+    assert (result["entries"], result["first_entry_id"], result["last_entry_id"]) == (10, 1, 10)
+    assert completed_epoch.query(func.count(SurveyEntry.id)).scalar() == 2
+    assert database.get_current_total_sum(completed_epoch) == 300.0
+    archived = archive.read_archived_entries(campaign=database.DEFAULT_CAMPAIGN, archive_dir=archive_dir)
+    assert sorted(archived["id"].tolist()) == list(range(1, 11))
+    # Nichts mehr zu archivieren
+    assert archive.archive_entries(completed_epoch, archive_dir=archive_dir) is None
+
+
+def test_rerun_after_crash_between_replace_and_commit_leaves_no_duplicates(completed_epoch, tmp_path, monkeypatch):
+    archive_dir = str(tmp_path / "archive")
+    # Erster Lauf: die Datei für 1-5 liegt schon im Archiv, das Löschen wird nie committet
+    with monkeypatch.context() as patch:
+        patch.setattr(archive, "delete", _crash_before_delete)
+        with pytest.raises(RuntimeError):
+            archive.archive_entries(completed_epoch, before=datetime.now() - timedelta(hours=2, minutes=30),
+                                    archive_dir=archive_dir)
+    assert [item["entries"] for item in archive.get_archive_files(archive_dir=archive_dir)] == [5]
+    assert completed_epoch.query(func.count(SurveyEntry.id)).scalar() == 12
+
+    # Der nächste Lauf umfasst inzwischen mehr Einträge und damit einen anderen ID-Bereich
+    result = archive.archive_entries(completed_epoch, archive_dir=archive_dir)
+
+    assert (result["first_entry_id"], result["last_entry_id"]) == (1, 10)
+    assert [item["name"] for item in archive.get_archive_files(archive_dir=archive_dir)] == \
+        ["entries_000000000001-000000000010.parquet"]
+    archived = archive.read_archived_entries(campaign=database.DEFAULT_CAMPAIGN, archive_dir=archive_dir)
+    assert sorted(archived["id"].tolist()) == list(range(1, 11))
+    assert completed_epoch.query(func.count(SurveyEntry.id)).scalar() == 2
+
+
+def test_overlapping_archive_keeps_entries_that_are_not_archived_again(completed_epoch, tmp_path, monkeypatch):
+    archive_dir = str(tmp_path / "archive")
+    with monkeypatch.context() as patch:
+        patch.setattr(archive, "delete", _crash_before_delete)
+        with pytest.raises(RuntimeError):
+            archive.archive_entries(completed_epoch, archive_dir=archive_dir)
+    # Die Einträge 1-5 stehen nur noch in der Datei 1-10 (z.B. von einem anderen Lauf gelöscht)
+    completed_epoch.query(SurveyEntry).filter(SurveyEntry.id <= 5).delete()
+    completed_epoch.commit()
+
+    result = archive.archive_entries(completed_epoch, archive_dir=archive_dir)
+
+    assert (result["first_entry_id"], result["last_entry_id"]) == (6, 10)
+    assert {item["name"]: item["entries"] for item in archive.get_archive_files(archive_dir=archive_dir)} == {
+        "entries_000000000001-000000000010.parquet": 5,
+        "entries_000000000006-000000000010.parquet": 5,
+    }
+    archived = archive.read_archived_entries(campaign=database.DEFAULT_CAMPAIGN, archive_dir=archive_dir)
+    assert sorted(archived["id"].tolist()) == list(range(1, 11))
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from sqlalchemy import func
+
+import database
+from database import SurveyEntry, add_survey_entries, add_survey_entry, get_current_total_sum
+
+THREADS = 16
+SUBMISSIONS_PER_THREAD = 25
+# Ziel sind Hunderte Einsendungen pro Sekunde; lokal schafft SQLite mit 16 Threads rund 400/s.
+# Die Untergrenze lässt Luft für langsame CI-Rechner, fängt aber einen Rückfall auf Sperren
+# (Busy-Timeouts, serielle Wartezeiten) zuverlässig ab.
+MIN_SUBMISSIONS_PER_SECOND = 100
+
+
+def _run_in_threads(session_factory, work):
+    errors = []
+
+    def run(thread_number):
+        session = session_factory()
+        try:
+            work(session, thread_number)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(THREADS)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    return time.perf_counter() - started_at
+
+
+def _count_and_sum(db_session):
+    return db_session.query(func.count(SurveyEntry.id), func.coalesce(func.sum(SurveyEntry.volume), 0.0)).one()
+
+
+def test_concurrent_single_submissions_lose_no_increments(session_factory, db_session):
+    def submit(session, thread_number):
+        for index in range(SUBMISSIONS_PER_THREAD):
+            add_survey_entry(session, float(thread_number * 1000 + index))
+
+    elapsed = _run_in_threads(session_factory, submit)
+
+    submissions_per_second = THREADS * SUBMISSIONS_PER_THREAD / elapsed
+    print(f"{db_session.bind.dialect.name}: {submissions_per_second:.0f} Einsendungen/s mit {THREADS} Threads")
+    assert submissions_per_second >= MIN_SUBMISSIONS_PER_SECOND
+    expected_sum = sum(float(thread_number * 1000 + index)
+                       for thread_number in range(THREADS) for index in range(SUBMISSIONS_PER_THREAD))
+    count, volume_sum = _count_and_sum(db_session)
+    assert count == THREADS * SUBMISSIONS_PER_THREAD
+    assert volume_sum == expected_sum
+    assert get_current_total_sum(db_session) == expected_sum
+
+
+def test_concurrent_batches_and_checkpoints_keep_total(db_engine, session_factory, db_session, monkeypatch):
+    # Checkpoints sofort nachziehen, damit sie gleichzeitig mit den Einsendungen laufen. SQLite
+    # vergibt die IDs in Commit-Reihenfolge; ein Datenbankserver nicht, dort braucht der Checkpoint
+    # seinen Sicherheitsabstand (verkürzt, damit er während des Tests vorrückt).
+    safety_seconds = 0 if db_engine.dialect.name == "sqlite" else 0.5
+    monkeypatch.setattr(database, "CHECKPOINT_SAFETY_SECONDS", safety_seconds)
+
+    def submit(session, thread_number):
+        for _ in range(SUBMISSIONS_PER_THREAD // 5):
+            add_survey_entries(session, [10.0, 20.0, 30.0, 40.0, 50.0])
+            database.advance_total_checkpoint(session)
+            time.sleep(safety_seconds / 2)
+
+    _run_in_threads(session_factory, submit)
+
+    count, volume_sum = _count_and_sum(db_session)
+    assert count == THREADS * SUBMISSIONS_PER_THREAD
+    assert volume_sum == THREADS * (SUBMISSIONS_PER_THREAD // 5) * 150.0
+    assert get_current_total_sum(db_session) == volume_sum
+    assert database.reconcile_total_sum(db_session)["consistent"]
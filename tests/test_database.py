@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from database import DEFAULT_CAMPAIGN, SurveyEntry
+
+
+def test_submission_token_makes_submissions_idempotent(db_session):
+    first_id = database.add_survey_entry(db_session, 100.0, submission_token="token-1")
+    assert database.add_survey_entry(db_session, 999.0, submission_token="token-1") == first_id
+    assert database.get_entry_id_for_token(db_session, "token-1") == first_id
+    assert database.get_entry_id_for_token(db_session, "unbekannt") is None
+
+    entry_ids = database.add_survey_entries(db_session, [1.0, 2.0, 3.0, 4.0],
+                                            submission_tokens=["token-1", "token-2", "token-2", None])
+    assert entry_ids[0] == first_id
+    assert entry_ids[1] == entry_ids[2]
+    assert len(set(entry_ids)) == 3
+    assert db_session.query(SurveyEntry).count() == 3
+    assert database.get_current_total_sum(db_session) == 100.0 + 2.0 + 4.0
+
+
+def test_contact_details_are_stored_and_counted_once(db_session):
+    entry_id = database.add_survey_entry(db_session, 2500.0)
+    database.update_survey_entry_with_contact(db_session, entry_id, "Gast", "Firma", "gast@example.de", "0711 123")
+    database.update_survey_entry_with_contact(db_session, entry_id, "Gast", "Firma", "neu@example.de", None)
+
+    entry = db_session.get(SurveyEntry, entry_id)
+    assert (entry.contact_name, entry.contact_email, entry.contact_phone) == ("Gast", "neu@example.de", None)
+    assert entry.has_contact_info
+    analytics = database.get_submission_analytics(db_session)
+    assert (analytics["entries"], analytics["contacts"], analytics["volume_sum"]) == (1, 1, 2500.0)
+
+
+def test_reset_starts_new_epoch_and_checkpoint_keeps_total(db_session, monkeypatch):
+    monkeypatch.setattr(database, "CHECKPOINT_SAFETY_SECONDS", 0)
+    database.add_survey_entries(db_session, [100.0, 200.0])
+    database.reset_total_sum(db_session)
+    assert database.get_current_total_sum(db_session) == 0.0
+
+    database.add_survey_entries(db_session, [10.0, 20.0])
+    assert database.advance_total_checkpoint(db_session)
+    database.add_survey_entry(db_session, 5.0)
+    assert database.get_current_total_sum(db_session) == 35.0
+
+    epochs = database.get_reset_epochs(db_session)
+    assert epochs[0].total_before_reset == 300.0
+    assert database.reconcile_total_sum(db_session)["consistent"]
+
+
+def test_reconcile_repairs_a_wrong_checkpoint(db_session, monkeypatch):
+    monkeypatch.setattr(database, "CHECKPOINT_SAFETY_SECONDS", 0)
+    database.add_survey_entries(db_session, [10.0, 20.0])
+    database.advance_total_checkpoint(db_session)
+    db_session.query(database.TotalCheckpoint).update({"partial_sum": 999.0})
+    db_session.commit()
+
+    result = database.reconcile_total_sum(db_session, repair=True)
+    assert not result["consistent"] and result["difference"] == 969.0
+    assert database.reconcile_total_sum(db_session)["consistent"]
+    assert database.get_current_total_sum(db_session) == 30.0
+
+
+def test_campaigns_have_separate_totals(db_session):
+    database.ensure_campaign(db_session, "messe-2025")
+    database.add_survey_entry(db_session, 100.0, campaign="messe-2025")
+    database.add_survey_entry(db_session, 7.0)
+    assert database.get_campaigns(db_session) == [DEFAULT_CAMPAIGN, "messe-2025"]
+    assert database.get_current_total_sum(db_session, "messe-2025") == 100.0
+    assert database.get_current_total_sum(db_session) == 7.0
+    with pytest.raises(ValueError):
+        database.ensure_campaign(db_session, "Ungültig!")
+
+
+def test_admin_pages_walk_all_entries_newest_first(db_session):
+    entry_ids = database.add_survey_entries(db_session, [float(index) for index in range(7)])
+    for entry_id in entry_ids[::2]:
+        database.update_survey_entry_with_contact(db_session, entry_id, "Gast", None, None, None)
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = database.get_volume_entries_page(db_session, after=cursor, page_size=3)
+        seen.extend(row.id for row in rows)
+        if cursor is None:
+            break
+    assert seen == sorted(entry_ids, reverse=True)
+
+    rows, cursor = database.get_contact_entries_page(db_session, page_size=10)
+    assert [row.id for row in rows] == sorted(entry_ids[::2], reverse=True) and cursor is None
+
+
+def test_exports_contain_typed_columns(db_session):
+    import pyarrow.parquet as pq
+    database.add_survey_entries(db_session, [1234.5, 10.0])
+
+    parquet_file = database.export_entries_parquet(db_session, chunk_size=1)
+    try:
+        table = pq.read_table(parquet_file)
+    finally:
+        parquet_file.close()
+    assert table.num_rows == 2
+    assert table.column("volume").to_pylist() == [10.0, 1234.5]
+    assert str(table.schema.field("timestamp").type).startswith("timestamp")
+
+    csv_file = database.export_entries_csv(db_session, lambda entries: entries[["id", "volume"]], chunk_size=1)
+    try:
+        lines = csv_file.read().decode("utf-8").splitlines()
+    finally:
+        csv_file.close()
+    assert lines == ["id,volume", "2,10.0", "1,1234.5"]
+
+
+def test_submissions_per_minute_come_from_rollups(db_session):
+    database.add_survey_entries(db_session, [100.0, 200.0])
+    since = datetime.now() - timedelta(hours=1)
+    rows = database.get_submissions_per_minute(db_session, since=since)
+    assert sum(row[1] for row in rows) == 2
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from formatting import format_german_currency, format_german_currency_column
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0, "0,00"),
+    (1234567.891, "1.234.567,89"),
+    (1.005, "1,00"),  # binär knapp unter dem halben Cent
+    # Genau ein halber Cent: gerundet wird zur geraden Ziffer
+    (0.125, "0,12"),
+    (0.375, "0,38"),
+    (-1234.5, "-1.234,50"),
+    # Wie bisher: ohne Ganzzahlteil verschwindet das Minus (int("-0") == 0)
+    (-0.5, "0,50"),
+    (12345678901234.56, "12.345.678.901.234,56"),
+])
+def test_format_german_currency(value, expected):
+    assert format_german_currency(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, float("nan"), float("inf"), float("-inf")])
+def test_format_german_currency_returns_na_for_missing_and_infinite_values(value):
+    assert format_german_currency(value) == "N/A"
+
+
+EDGE_CASES = [
+    None, float("nan"), float("inf"), float("-inf"), 0.0, -0.0, 0.004, 0.005, 0.015, 0.125, 0.375, 2.675,
+    1.005, -0.5, -0.005, -1.005, -1234.5, 999.995, 999999.995, 1e12 + 0.005, 9.99e12, 1e13, -1e13,
+    123456789012345.67, 1e300,
+]
+
+
+def _scalar(values):
+    return [format_german_currency(value) for value in values]
+
+
+def test_column_matches_scalar_function_for_edge_cases():
+    assert list(format_german_currency_column(EDGE_CASES)) == _scalar(EDGE_CASES)
+
+
+def test_column_matches_scalar_function_for_random_and_half_cent_values():
+    rng = random.Random(20250601)
+    values = [rng.uniform(-1e9, 1e9) for _ in range(20000)]
+    values += [rng.randrange(-10 ** 9, 10 ** 9) / 100 for _ in range(20000)]
+    # Genau auf einem halben Cent: hier entscheidet die exakte Binärdarstellung über die Rundung
+    values += [rng.randrange(-10 ** 8, 10 ** 8) / 100 + 0.005 for _ in range(20000)]
+    values += [rng.uniform(1e12, 1e15) for _ in range(2000)]
+    assert list(format_german_currency_column(np.array(values))) == _scalar(values)
+
+
+def test_column_keeps_series_index_and_accepts_integers():
+    series = pd.Series([1500, None, 2.5], index=[7, 3, 9], dtype=object)
+    result = format_german_currency_column(series)
+    assert list(result.index) == [7, 3, 9]
+    assert list(result) == ["1.500,00", "N/A", "2,50"]
+
+    integers = format_german_currency_column(np.array([0, -7, 1000000], dtype=np.int64))
+    assert list(integers) == ["0,00", "-7,00", "1.000.000,00"]
+
+
+def test_column_of_nothing_is_empty():
+    assert list(format_german_currency_column([])) == []
@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+from sqlalchemy import func
+
+import database
+from database import SurveyEntry
+from journal import JOURNAL_FILENAME, SubmissionJournal
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return str(tmp_path / "journal")
+
+
+def _journal(journal_dir, session_factory):
+    # Der Hintergrund-Thread soll in den Tests nur auf ausdrücklichen Aufruf übertragen
+    return SubmissionJournal(journal_dir, session_factory=session_factory, replay_interval_seconds=3600)
+
+
+def test_append_after_partial_line_keeps_submission(journal_dir, session_factory, db_session):
+    os.makedirs(journal_dir)
+    # Absturz mitten im Schreiben: die Zeile wurde nie bestätigt
+    with open(os.path.join(journal_dir, JOURNAL_FILENAME), "w") as journal_file:
+        journal_file.write(json.dumps({"token": "vorher", "volume": 5.0, "campaign": "default"})[:20])
+
+    journal = _journal(journal_dir, session_factory)
+    try:
+        token = journal.append(100.0, database.DEFAULT_CAMPAIGN)
+        journal.replay()
+    finally:
+        journal.stop()
+
+    assert database.get_entry_id_for_token(db_session, token) is not None
+    assert db_session.query(func.count(SurveyEntry.id)).scalar() == 1
+    assert database.get_current_total_sum(db_session) == 100.0
+
+
+def test_processes_sharing_a_journal_replay_each_submission_once(journal_dir, session_factory, db_session):
+    # Zwei Instanzen auf demselben Verzeichnis, wie App und survey_api.py
+    journals = [_journal(journal_dir, session_factory) for _ in range(2)]
+    tokens = [journals[index % 2].append(float(index), database.DEFAULT_CAMPAIGN) for index in range(200)]
+
+    errors = []
+
+    def replay(journal):
+        try:
+            for _ in range(5):
+                journal.replay()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=replay, args=(journal,)) for journal in journals * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for journal in journals:
+        journal.stop()
+
+    assert errors == []
+    assert journals[0].pending() == 0
+    assert db_session.query(func.count(SurveyEntry.id)).scalar() == len(tokens)
+    assert all(database.get_entry_id_for_token(db_session, token) is not None for token in tokens)
+
+
+def _hold_write_lock(db_engine):
+    # Hält wie ein hängender Schreiber eine Schreibsperre auf survey_entries; gibt die Freigabe zurück
+    if db_engine.dialect.name == "sqlite":
+        connection = sqlite3.connect(db_engine.url.database, isolation_level=None)
+        connection.execute("BEGIN IMMEDIATE")
+        return lambda: (connection.rollback(), connection.close())
+    connection = db_engine.connect()
+    connection.exec_driver_sql("LOCK TABLE survey_entries IN ACCESS EXCLUSIVE MODE")
+    return lambda: (connection.rollback(), connection.close())
+
+
+def test_save_falls_back_to_journal_after_short_lock_timeout(journal_dir, db_engine, session_factory, db_session):
+    journal = _journal(journal_dir, session_factory)
+    release = _hold_write_lock(db_engine)
+    try:
+        started_at = time.monotonic()
+        entry_id = journal.save(100.0, database.DEFAULT_CAMPAIGN, "b7c3a7a4-5a8e-4a55-9f3e-1e1a9f0c2d11",
+                                fallback_seconds=0.5)
+        elapsed = time.monotonic() - started_at
+    finally:
+        release()
+    try:
+        # Bestätigt über das Journal, weit vor dem Busy-Timeout von SQLITE_BUSY_TIMEOUT_SECONDS
+        assert entry_id is None
+        assert elapsed < 0.5 + 2.0 < database.SQLITE_BUSY_TIMEOUT_SECONDS
+        assert journal.pending() == 1
+        assert journal.replay() == 1
+    finally:
+        journal.stop()
+    assert database.get_entry_id_for_token(db_session, "b7c3a7a4-5a8e-4a55-9f3e-1e1a9f0c2d11") is not None
+
+    # Ohne Sperre speichert save direkt
+    journal = _journal(journal_dir, session_factory)
+    try:
+        assert journal.save(50.0, database.DEFAULT_CAMPAIGN, None) is not None
+        assert journal.pending() == 0
+    finally:
+        journal.stop()
+    assert database.get_current_total_sum(db_session) == 150.0
@@ -0,0 +1,148 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import SchemaVersion, SubmissionRollup, SurveyEntry
+
+# Schema von 'umfrage_data.db' vor den Migrationen (so hat create_all es damals angelegt)
+BASELINE_SCHEMA = """
+CREATE TABLE survey_entries (
+    id INTEGER NOT NULL,
+    volume FLOAT NOT NULL,
+    contact_name VARCHAR(255),
+    contact_company VARCHAR(255),
+    contact_email VARCHAR(255),
+    contact_phone VARCHAR(255),
+    timestamp DATETIME,
+    has_contact_info BOOLEAN,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_survey_entries_id ON survey_entries (id);
+CREATE TABLE total_sum (
+    id INTEGER NOT NULL,
+    current_total FLOAT NOT NULL,
+    last_updated DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_total_sum_id ON total_sum (id);
+"""
+
+BASELINE_ENTRIES = 300
+# Die alte Summentabelle wurde beim Zurücksetzen auf 0 gesetzt und zählte danach weiter;
+# ihr Stand wird zum Anfangsbestand der ersten Epoche
+BASELINE_TOTAL = 1234.5
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    path = tmp_path / "umfrage_data.db"
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    started_at = datetime(2025, 6, 1, 18, 0)
+    connection.executemany(
+        "INSERT INTO survey_entries (volume, contact_name, contact_email, timestamp, has_contact_info) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(float(index * 10), f"Gast {index}" if index % 3 == 0 else None,
+          f"gast{index}@example.de" if index % 3 == 0 else None,
+          (started_at + timedelta(seconds=index)).isoformat(sep=" "), index % 3 == 0)
+         for index in range(BASELINE_ENTRIES)],
+    )
+    connection.execute("INSERT INTO total_sum (current_total, last_updated) VALUES (?, ?)",
+                       (BASELINE_TOTAL, started_at.isoformat(sep=" ")))
+    connection.commit()
+    connection.close()
+    engine = create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+def _query_plans(engine, run_queries):
+    """
+    Führt die Abfragen aus und gibt je SELECT auf survey_entries den EXPLAIN QUERY PLAN als Text zurück.
+    """
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM survey_entries" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        session = sessionmaker(bind=engine)()
+        try:
+            run_queries(session)
+        finally:
+            session.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append(" | ".join(row[-1] for row in rows))
+    return plans
+
+
+def _assert_admin_pages_use_indexes(engine):
+    def volume_pages(session):
+        rows, cursor = database.get_volume_entries_page(session, page_size=50)
+        database.get_volume_entries_page(session, after=cursor, page_size=50)
+
+    def contact_pages(session):
+        rows, cursor = database.get_contact_entries_page(session, page_size=50)
+        database.get_contact_entries_page(session, after=cursor, page_size=50)
+
+    volume_plans = _query_plans(engine, volume_pages)
+    contact_plans = _query_plans(engine, contact_pages)
+    assert len(volume_plans) == 2 and len(contact_plans) == 2
+    for plan in volume_plans:
+        assert "ix_survey_entries_campaign_timestamp_id" in plan
+        assert "TEMP B-TREE" not in plan
+    for plan in contact_plans:
+        assert "ix_survey_entries_campaign_contacts" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_baseline_database_is_upgraded_in_place(baseline_engine):
+    database.create_db_tables(baseline_engine)
+
+    session = sessionmaker(bind=baseline_engine)()
+    try:
+        versions = [row.version for row in session.query(SchemaVersion).order_by(SchemaVersion.version)]
+        assert versions == [version for version, _, _ in database.MIGRATIONS]
+        # Alle Einträge bleiben erhalten und gehören zur Standard-Kampagne
+        assert session.query(func.count(SurveyEntry.id)).scalar() == BASELINE_ENTRIES
+        assert {row.campaign for row in session.query(SurveyEntry.campaign).distinct()} == {database.DEFAULT_CAMPAIGN}
+        assert session.query(func.count(SurveyEntry.id)).filter(SurveyEntry.has_contact_info == True).scalar() == 100
+        # Die Live-Summe übernimmt den alten Stand; neue Einträge zählen dazu
+        assert database.get_current_total_sum(session) == BASELINE_TOTAL
+        entry_id = database.add_survey_entry(session, 100.0, submission_token="token-nach-migration")
+        assert entry_id == BASELINE_ENTRIES + 1
+        assert database.get_current_total_sum(session) == BASELINE_TOTAL + 100.0
+        # Die Auswertung enthält auch die Einträge von vor der Migration
+        entries, contacts = session.query(func.sum(SubmissionRollup.entries), func.sum(SubmissionRollup.contacts)).one()
+        assert (entries, contacts) == (BASELINE_ENTRIES + 1, 100)
+    finally:
+        session.close()
+
+    # Ein zweiter Start ändert nichts mehr
+    assert database.run_migrations(baseline_engine) == []
+
+
+def test_upgraded_database_uses_admin_indexes(baseline_engine):
+    database.create_db_tables(baseline_engine)
+    _assert_admin_pages_use_indexes(baseline_engine)
+
+
+def test_fresh_database_uses_admin_indexes(db_engine, db_session):
+    if db_engine.dialect.name != "sqlite":
+        pytest.skip("EXPLAIN QUERY PLAN gibt es nur bei SQLite")
+    database.add_survey_entries(db_session, [float(index) for index in range(200)])
+    for entry_id in range(1, 200, 4):
+        database.update_survey_entry_with_contact(db_session, entry_id, "Gast", None, "gast@example.de", None)
+    _assert_admin_pages_use_indexes(db_engine)
@@ -0,0 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmark import APP_DIR, PARTICIPANT_FORBIDDEN_MODULES, _PARTICIPANT_PATH_SCRIPT
+
+pytest.importorskip("streamlit")
+
+
+def test_participant_pages_do_not_import_heavy_libraries(tmp_path):
+    # Eigener Prozess: im Testprozess sind pandas & Co. längst von anderen Tests geladen
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PARTICIPANT_PATH_SCRIPT,
+         os.path.join(APP_DIR, "app.py"), *PARTICIPANT_FORBIDDEN_MODULES],
+        cwd=tmp_path, capture_output=True, text=True, timeout=300,
+        env=dict(os.environ, PYTHONPATH=APP_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+                 DATABASE_URL=f"sqlite:///{tmp_path / 'umfrage_data.db'}"),
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+    loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert loaded == []
+    # -X importtime listet jedes geladene Modul, auch indirekt importierte
+    imported = {line.rsplit("|", 1)[1].strip().split(".")[0]
+                for line in completed.stderr.splitlines() if line.startswith("import time:")}
+    assert imported.isdisjoint(PARTICIPANT_FORBIDDEN_MODULES)
@@ -0,0 +1,98 @@
+import pytest
+
+from rate_limiting import IDLE_BUCKET_SECONDS, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_burst_is_allowed_then_rejected(clock):
+    limiter = RateLimiter(3, 1 / 10, clock=clock)
+    assert [limiter.allow("gast") for _ in range(4)] == [True, True, True, False]
+    # Andere Schlüssel haben einen eigenen Bucket
+    assert limiter.allow("anderer-gast")
+
+
+def test_tokens_refill_over_time_up_to_capacity(clock):
+    limiter = RateLimiter(2, 1 / 10, clock=clock)
+    assert limiter.allow("gast") and limiter.allow("gast")
+    assert not limiter.allow("gast")
+
+    clock.advance(9.9)
+    assert not limiter.allow("gast")
+    clock.advance(0.1)
+    assert limiter.allow("gast")
+
+    # Nach langer Pause ist der Bucket höchstens wieder voll
+    clock.advance(3600)
+    assert [limiter.allow("gast") for _ in range(3)] == [True, True, False]
+
+
+def test_retry_after(clock):
+    limiter = RateLimiter(1, 1 / 10, clock=clock)
+    assert limiter.retry_after("gast") == 0.0
+    assert limiter.allow("gast")
+    assert limiter.retry_after("gast") == pytest.approx(10.0)
+    clock.advance(4)
+    assert limiter.retry_after("gast") == pytest.approx(6.0)
+    clock.advance(6)
+    assert limiter.retry_after("gast") == 0.0
+
+    # Ohne Nachfüllen gibt es keinen sinnvollen Zeitpunkt
+    never_refilled = RateLimiter(1, 0, clock=clock)
+    assert never_refilled.allow("gast") and not never_refilled.allow("gast")
+    assert never_refilled.retry_after("gast") == 0.0
+
+
+def test_ip_limit_admits_a_venue_burst_and_then_limits_per_minute(clock):
+    # Standardwerte der App: Burst 1000, danach 1200 pro Minute je IP-Adresse
+    limiter = RateLimiter(1000, 1200 / 60, clock=clock)
+    # Ein ganzer Saal (300 Gäste) hinter derselben WLAN-Adresse innerhalb von zehn Sekunden
+    admitted = 0
+    for _ in range(300):
+        admitted += limiter.allow("192.0.2.1")
+        clock.advance(10 / 300)
+    assert admitted == 300
+
+    # Eine Flut darüber hinaus wird nach dem Burst auf 20 pro Sekunde begrenzt
+    flood = sum(limiter.allow("192.0.2.1") for _ in range(2000))
+    assert 700 <= flood <= 1000
+    assert not limiter.allow("192.0.2.1")
+    clock.advance(1)
+    assert sum(limiter.allow("192.0.2.1") for _ in range(100)) == 20
+
+
+def test_session_limit_allows_six_per_minute(clock):
+    limiter = RateLimiter(6, 6 / 60, clock=clock)
+    assert sum(limiter.allow("session") for _ in range(10)) == 6
+    assert limiter.retry_after("session") == pytest.approx(10.0)
+    clock.advance(60)
+    assert sum(limiter.allow("session") for _ in range(10)) == 6
+
+
+def test_idle_buckets_are_removed(clock):
+    limiter = RateLimiter(2, 1 / 60, clock=clock)
+    limiter.allow("alt")
+    clock.advance(IDLE_BUCKET_SECONDS / 2)
+    limiter.allow("neu")
+    assert set(limiter._buckets) == {"alt", "neu"}
+
+    # Beim nächsten Aufräumen verschwindet nur der Bucket, der lange nicht benutzt wurde
+    clock.advance(IDLE_BUCKET_SECONDS / 2)
+    limiter.allow("dritter")
+    assert set(limiter._buckets) == {"neu", "dritter"}
+    # Ein verworfener Bucket beginnt wieder voll
+    assert limiter.allow("alt") and limiter.allow("alt")
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import database
+from submission_queue import SubmissionQueue
+
+
+class FlakySessionFactory:
+    """
+    Session-Factory, deren erste 'failures' Aufrufe fehlschlagen (z.B. Datenbankserver nicht erreichbar).
+    """
+
+    def __init__(self, session_factory, failures):
+        self._session_factory = session_factory
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures > 0:
+            self.failures -= 1
+            raise OperationalError("connect", {}, Exception("connection refused"))
+        return self._session_factory()
+
+
+def test_failing_session_factory_is_reported_and_writer_keeps_running(session_factory, db_session):
+    submission_queue = SubmissionQueue(session_factory=FlakySessionFactory(session_factory, failures=1))
+    try:
+        with pytest.raises(OperationalError):
+            submission_queue.submit(10.0, timeout=5)
+        # Der Schreib-Thread läuft weiter und speichert die nächste Einsendung
+        entry_id = submission_queue.submit(20.0, timeout=5)
+    finally:
+        submission_queue.stop()
+
+    assert entry_id is not None
+    assert database.get_current_total_sum(db_session) == 20.0
+
+
+def test_error_while_batching_fails_the_batch_and_writer_keeps_running(session_factory, db_session, monkeypatch):
+    submission_queue = SubmissionQueue(session_factory=session_factory)
+    write_batch = submission_queue._write_batch
+
+    def fail_once(batch):
+        monkeypatch.setattr(submission_queue, "_write_batch", write_batch)
+        raise RuntimeError("Fehler beim Bündeln")
+
+    monkeypatch.setattr(submission_queue, "_write_batch", fail_once)
+    try:
+        with pytest.raises(RuntimeError):
+            submission_queue.submit(10.0, timeout=5)
+        entry_id = submission_queue.submit(30.0, timeout=5)
+    finally:
+        submission_queue.stop()
+
+    assert entry_id is not None
+    assert database.get_current_total_sum(db_session) == 30.0
@@ -0,0 +1,141 @@
+import http.client
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+import pytest
+
+import database
+import survey_api
+from survey_api import _client_ip, create_metrics_server, create_server, parse_trusted_proxies
+
+
+@pytest.fixture
+def sqlite_schema(db_engine):
+    # survey_api.py arbeitet immer mit der Datenbank aus DATABASE_URL
+    if db_engine.dialect.name != "sqlite":
+        pytest.skip("survey_api.py nutzt die Datenbank aus DATABASE_URL")
+    return db_engine
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.server_address[1]
+
+
+@pytest.fixture
+def start_server(sqlite_schema, tmp_path):
+    servers = []
+
+    def start(**options):
+        options.setdefault("journal_dir", str(tmp_path / "journal"))
+        server = create_server("127.0.0.1", 0, **options)
+        servers.append(server)
+        return server, _serve(server)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        if server.journal is not None:
+            server.journal.stop()
+
+
+def _request(port, method, path, payload=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        body = json.dumps(payload) if payload is not None else None
+        connection.request(method, path, body=body, headers={"Content-Type": "application/json", **(headers or {})})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def test_client_ip_is_read_from_trusted_proxies_only():
+    proxies = parse_trusted_proxies("127.0.0.1, 10.0.0.0/8")
+    # Direkte Anfrage: X-Forwarded-For kann jeder setzen
+    assert _client_ip("203.0.113.7", "198.51.100.1", proxies) == "203.0.113.7"
+    # Über den eigenen Proxy
+    assert _client_ip("127.0.0.1", "198.51.100.1", proxies) == "198.51.100.1"
+    # Zwei eigene Proxys hintereinander; was der Gast links einträgt, zählt nicht
+    assert _client_ip("127.0.0.1", "192.0.2.55, 198.51.100.1, 10.1.2.3", proxies) == "198.51.100.1"
+    # Ohne Header oder mit unbrauchbarem Eintrag bleibt es beim letzten Proxy
+    assert _client_ip("127.0.0.1", "", proxies) == "127.0.0.1"
+    assert _client_ip("127.0.0.1", "unbekannt, 10.1.2.3", proxies) == "10.1.2.3"
+
+
+def test_rate_limit_counts_forwarded_clients_separately(start_server):
+    server, port = start_server(rate_limit_per_minute=60, rate_limit_burst=2,
+                                trusted_proxies=parse_trusted_proxies("127.0.0.1"))
+
+    def submit(client_ip):
+        return _request(port, "POST", "/api/submissions", {"volume": 10.0}, {"X-Forwarded-For": client_ip})[0]
+
+    assert [submit("198.51.100.1") for _ in range(3)] == [201, 201, 429]
+    assert submit("198.51.100.2") == 201
+
+
+def test_submission_is_acknowledged_from_journal_while_database_is_locked(start_server, sqlite_schema, db_session):
+    server, port = start_server(journal_fallback_seconds=0.5)
+    token = str(uuid.uuid4())
+    # Ein anderer Schreiber hält die Datenbank gesperrt
+    connection = sqlite3.connect(sqlite_schema.url.database, isolation_level=None)
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        started_at = time.monotonic()
+        status, body = _request(port, "POST", "/api/submissions", {"volume": 75.0, "token": token})
+        elapsed = time.monotonic() - started_at
+    finally:
+        connection.rollback()
+        connection.close()
+
+    assert status == 201
+    assert json.loads(body) == {"token": token, "entry_id": None}
+    assert elapsed < 0.5 + 2.0
+    assert server.journal.replay() == 1
+    assert database.get_entry_id_for_token(db_session, token) is not None
+
+
+def test_unknown_contact_token_is_rejected_without_replay(start_server, monkeypatch):
+    server, port = start_server()
+    monkeypatch.setattr(server.journal, "replay", lambda: pytest.fail("Journal ohne Einträge übertragen"))
+
+    status, _ = _request(port, "POST", f"/api/submissions/{uuid.uuid4()}/contact", {"name": "Gast"})
+    assert status == 404
+
+
+def test_contact_for_journaled_submission_replays_journal(start_server, db_session):
+    server, port = start_server()
+    token = server.journal.append(250.0, database.DEFAULT_CAMPAIGN, str(uuid.uuid4()))
+
+    status, _ = _request(port, "POST", f"/api/submissions/{token}/contact", {"email": "gast@example.de"})
+    assert status == 200
+    assert database.get_entry_id_for_token(db_session, token) is not None
+
+
+def test_contact_route_is_rate_limited(start_server):
+    server, port = start_server(rate_limit_per_minute=60, rate_limit_burst=1)
+
+    statuses = [_request(port, "POST", f"/api/submissions/{uuid.uuid4()}/contact", {"name": "Gast"})[0]
+                for _ in range(2)]
+    assert statuses == [404, 429]
+
+
+def test_metrics_are_served_on_localhost_only(start_server):
+    server, port = start_server()
+    assert _request(port, "GET", "/metrics")[0] == 404
+
+    metrics_server = create_metrics_server(0)
+    try:
+        metrics_port = _serve(metrics_server)
+        assert metrics_server.server_address[0] == survey_api.METRICS_HOST == "127.0.0.1"
+        status, body = _request(metrics_port, "GET", "/metrics")
+        assert status == 200
+        assert body.startswith(b"# ")
+    finally:
+        metrics_server.shutdown()
+        metrics_server.server_close()